@@ -1,17 +1,194 @@
 import os
+import re
 import time
 import json
+import threading
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+try:
+    # C实现的HTML解析器（lexbor），比html.parser快一个数量级且解析时释放GIL
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
 from openai import AzureOpenAI
 from qwen_agent.tools.base import BaseTool
 from qwen_agent.tools.base import register_tool
 
+try:
+    # orjson（Rust实现）的序列化/反序列化比标准库json快数倍，未安装时回退到json
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False）"""
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False）"""
+        return json.dumps(obj, ensure_ascii=False)
+
 # 硬编码API配置
 AZURE_ENDPOINT = "https://test-openai-startup.openai.azure.com/"
 AZURE_DEPLOYMENT = "gpt-4o"
 AZURE_API_KEY = "xxx"
 AZURE_API_VERSION = "2025-01-01-preview"
+LLM_MAX_RETRIES = 5                   # 交给OpenAI SDK重试（指数退避+抖动，遵守x-ratelimit/Retry-After）
+LLM_RPM_LIMIT = 300                   # 部署的每分钟请求数配额（按实际Azure配额调整）
+LLM_TPM_LIMIT = 150000                # 部署的每分钟token配额（按实际Azure配额调整）
+
+# HTTP连接池配置（与爬虫线程数匹配，复用TCP/TLS连接）
+HTTP_POOL_CONNECTIONS = 8
+HTTP_POOL_MAXSIZE = HTTP_POOL_CONNECTIONS * 2
+HTTP_MAX_RETRIES = 3                  # 瞬时错误（429/5xx）由urllib3自动重试，并遵守Retry-After
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate",
+}
+MAX_PAGE_BYTES = 2 * 1024 * 1024      # 单个页面最多读取2MB（超大页面提前截断，控制每个线程的内存占用）
+PAGE_CHUNK_SIZE = 64 * 1024
+
+# 发送给LLM的网页内容上限（约6k tokens），控制每次调用的延迟与TPM消耗
+MAX_CONTENT_CHARS = 24000
+# Sphinx生成的文档用这些class标记版本变更说明
+CHANGE_NOTE_SELECTOR = "div.deprecated, div.versionchanged, div.versionadded, div.versionremoved"
+# 页面中完全没有这些变更关键词时跳过LLM调用（下游预处理也会删除这类空结果）
+CHANGE_KEYWORDS_RE = re.compile(
+    r"\b(deprecat\w*|removed|replaced_by|versionchanged|versionadded|versionremoved|"
+    r"changed in version|new in version|will be removed|no longer)\b",
+    re.IGNORECASE,
+)
+# 跳过LLM时返回的空结果字段（与提示词中的输出格式一致）
+EMPTY_RESULT_FIELDS = (
+    "api", "package", "language", "deprecated_in", "removed_in",
+    "replaced_by", "change_type", "reason", "source", "docstring",
+)
+
+
+def build_session():
+    """创建共享的requests会话（连接池在多线程间复用）"""
+    session = requests.Session()
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=1,
+        backoff_jitter=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HTTP_HEADERS)
+    return session
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶，同时限制每分钟请求数(RPM)和token数(TPM)
+    调用LLM前主动等待配额，而不是等到429再退避重试
+    """
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """按流逝时间补充配额（调用方需持有锁）"""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens):
+        """阻塞直到有1个请求配额和tokens个token配额可用"""
+        tokens = min(tokens, self.tpm)  # 超过整桶容量的请求也要能放行
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm,
+                )
+            time.sleep(max(wait, 0.01))
+
+    def sync(self, remaining_requests=None, remaining_tokens=None):
+        """用服务端返回的x-ratelimit-remaining-*校正本地余量（只向下校正）"""
+        with self._lock:
+            self._refill()
+            if remaining_requests is not None:
+                self._requests = min(self._requests, remaining_requests)
+            if remaining_tokens is not None:
+                self._tokens = min(self._tokens, remaining_tokens)
+
+
+def _header_int(headers, name):
+    """读取整数型响应头，缺失或格式错误时返回None"""
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def build_azure_client():
+    """创建Azure OpenAI客户端（底层httpx连接池按爬虫线程数配置，多线程共享）"""
+    return AzureOpenAI(
+        azure_endpoint=AZURE_ENDPOINT,
+        api_key=AZURE_API_KEY,
+        api_version=AZURE_API_VERSION,
+        max_retries=LLM_MAX_RETRIES,
+        http_client=httpx.Client(
+            limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+        ),
+    )
+
+
+# 模块级单例：所有Visit实例复用同一个客户端及其连接池，避免重复TLS握手
+_AZURE_CLIENT = build_azure_client()
+
+
+def html_to_text(html):
+    """
+    移除script/style后提取页面纯文本（优先selectolax，未安装时回退到BeautifulSoup）
+    Sphinx文档的版本变更块会被提到文本最前面，保证截断后仍然保留
+    """
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        tree.strip_tags(["script", "style"])
+        if tree.root is None:
+            return ""
+        notes = [node.text(separator='\n', strip=True) for node in tree.css(CHANGE_NOTE_SELECTOR)]
+        text = tree.root.text(separator='\n', strip=True)
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+        for script in soup(["script", "style"]):
+            script.decompose()
+        notes = [node.get_text(separator='\n', strip=True) for node in soup.select(CHANGE_NOTE_SELECTOR)]
+        text = soup.get_text(separator='\n', strip=True)
+
+    if notes:
+        return "VERSION NOTES:\n" + "\n\n".join(notes) + "\n\nFULL PAGE CONTENT:\n" + text
+    return text
+
 
 # 英文提取提示词（注意JSON部分的大括号已转义）
 extractor_prompt = """Process the following webpage content and user goal to extract detailed information about API version changes:
@@ -54,6 +231,11 @@ Extract the API's change information across different versions, including:
   "docstring": "Complete docstring with Parameters, Returns, Raises, Examples"
 }}
 """
+
+# 模板只在导入时解析一次：拆成网页内容前后两段（同时还原转义的大括号），每次调用直接拼接
+_PROMPT_HEAD, _PROMPT_TAIL = extractor_prompt.format(webpage_content="{webpage_content}").split("{webpage_content}", 1)
+
+
 @register_tool('visit')
 class Visit:
     name = 'visit'  # 与注册装饰器的名称完全一致
@@ -71,67 +253,94 @@ class Visit:
         "required": ["url"]
     }
 
+    # 所有实例共享同一个会话，避免每个URL重新握手
+    _session = build_session()
+    # 所有实例（线程）共享同一个限流器，整体不超过部署配额
+    _rate_limiter = TokenBucket(LLM_RPM_LIMIT, LLM_TPM_LIMIT)
+    # 关键词预过滤统计：checked为检查的页面数，skipped为跳过LLM的页面数
+    filter_stats = {"checked": 0, "skipped": 0}
+    _stats_lock = threading.Lock()
 
     
     def __init__(self):
-        # 初始化Azure OpenAI客户端
-        self.client = AzureOpenAI(
-            azure_endpoint=AZURE_ENDPOINT,
-            api_key=AZURE_API_KEY,
-            api_version=AZURE_API_VERSION,
+        # 复用模块级Azure OpenAI客户端
+        self.client = _AZURE_CLIENT
+
+    def _create_completion(self, request):
+        """发送一次请求，并用响应头中的剩余配额校正限流器"""
+        raw = self.client.chat.completions.with_raw_response.create(**request)
+        self._rate_limiter.sync(
+            _header_int(raw.headers, "x-ratelimit-remaining-requests"),
+            _header_int(raw.headers, "x-ratelimit-remaining-tokens"),
         )
+        return raw.parse()
 
     def llm(self, messages):
-        """调用Azure OpenAI进行内容提取"""
-        max_retries = 10
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=AZURE_DEPLOYMENT,
-                    messages=messages,
-                    response_format={"type": "json_object"},
-                )
-                return response.choices[0].message.content
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise e
-                time.sleep(2 **attempt)
-        return ""
+        """调用Azure OpenAI进行内容提取（先经限流器取配额；429/5xx/网络错误由SDK客户端自动重试）"""
+        request = dict(
+            model=AZURE_DEPLOYMENT,
+            messages=messages,
+            response_format={"type": "json_object"},
+        )
+        # 粗略估算输入token数（约4字符/token）
+        estimated_tokens = sum(len(m["content"]) for m in messages) // 4
+        self._rate_limiter.acquire(estimated_tokens)
+        response = self._create_completion(request)
+        return response.choices[0].message.content
 
     def read_webpage(self, url):
-        """使用requests和BeautifulSoup读取网页内容"""
+        """使用requests读取网页并提取纯文本内容"""
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()  # 抛出HTTP错误
-            
-            # 使用BeautifulSoup提取文本内容
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # 移除脚本和样式标签
-            for script in soup(["script", "style"]):
-                script.decompose()
-            # 获取纯文本内容
-            text = soup.get_text(separator='\n', strip=True)
-            return text
+            with self._session.get(url, timeout=(5, 10), stream=True) as response:
+                response.raise_for_status()  # 抛出HTTP错误
+
+                # 非文本内容（PDF、压缩包等）直接跳过，避免下载二进制文件
+                content_type = response.headers.get("Content-Type", "")
+                if content_type and not any(t in content_type for t in ("html", "xml", "text")):
+                    print(f"跳过非文本内容: {url} ({content_type})")
+                    return ""
+
+                # 分块读取，超过MAX_PAGE_BYTES即停止
+                buf = bytearray()
+                for chunk in response.iter_content(PAGE_CHUNK_SIZE):
+                    buf += chunk
+                    if len(buf) >= MAX_PAGE_BYTES:
+                        break
+                html = buf.decode(response.encoding or 'utf-8', errors='replace')
+
+            # 提取纯文本内容（已移除脚本和样式标签）
+            return html_to_text(html)
         except Exception as e:
             print(f"网页读取错误: {str(e)}")
             return ""
 
     def call(self, params):
         """主调用方法：读取网页并提取信息"""
-        params = json.loads(params)
+        params = json_loads(params)
         url = params.get("url")
         goal = params.get("goal")
         
         # 读取网页内容
         webpage_content = self.read_webpage(url)
         if not webpage_content:
-            return json.dumps({"error": "无法读取网页内容"}, ensure_ascii=False)
+            return json_dumps({"error": "无法读取网页内容"})
         
+        # 内容过长时截断（版本变更说明已在最前面）
+        webpage_content = webpage_content[:MAX_CONTENT_CHARS]
+
+        # 没有任何变更关键词的页面直接返回空结果，省去LLM调用
+        has_keywords = CHANGE_KEYWORDS_RE.search(webpage_content) is not None
+        with self._stats_lock:
+            self.filter_stats["checked"] += 1
+            if not has_keywords:
+                self.filter_stats["skipped"] += 1
+        if not has_keywords:
+            result = dict.fromkeys(EMPTY_RESULT_FIELDS, "")
+            result["examples"] = []
+            return json_dumps(result)
+
         # 构建提示词
-        prompt = extractor_prompt.format(webpage_content=webpage_content)
+        prompt = _PROMPT_HEAD + webpage_content + _PROMPT_TAIL
         
         # 调用LLM提取信息
         messages = [{"role": "user", "content": prompt}]
@@ -4,6 +4,7 @@ import json
 import csv
 import time
 import threading
+from collections import namedtuple
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from WebAgent.WebDancer.demos.tools.private.visit import Visit
@@ -19,6 +20,9 @@ RETRY_DELAY = 1                       # 重试间隔1秒（减少总耗时）
 MAX_WORKERS = 8                       # 线程数：建议8-16（根据CPU/网络调整，避免被封IP）
 BATCH_SIZE = 50                       # 每爬取50条URL，同步一次临时文件（防止崩溃丢失数据）
 
+# 待爬任务（namedtuple没有__dict__，比每行一个dict省内存）
+UrlJob = namedtuple("UrlJob", "url original_row_num")
+
 # 全局锁（避免多线程写入CSV冲突）
 csv_lock = threading.Lock()
 
@@ -52,10 +56,7 @@ def load_urls_from_csv(csv_file, temp_file=TEMP_CSV):
             for row_num, row in enumerate(reader, 2):  # 行号从2开始（表头为1）
                 url = row["url"].strip()
                 if url and url not in completed_urls:  # 跳过空URL和已完成的URL
-                    all_urls.append({
-                        "url": url,
-                        "original_row_num": row_num  # 记录原始行号，便于核对
-                    })
+                    all_urls.append(UrlJob(url, row_num))  # 记录原始行号，便于核对
         
         total_input = len(all_urls) + len(completed_urls)
         print(f"✅ 从输入CSV加载完成：总计 {total_input} 条URL，待爬取 {len(all_urls)} 条，已完成 {len(completed_urls)} 条")
@@ -131,15 +132,18 @@ def crawl_single_api(url, original_row_num):
     return result
 
 
-def write_result_to_csv(result, csv_file, lock):
-    """线程安全的CSV写入函数（通过锁避免多线程写入冲突）"""
+def write_result_to_csv(result, writer, lock):
+    """线程安全的CSV写入函数（写入长期打开的临时文件句柄，由调用方按批次刷盘）"""
     with lock:
-        with open(csv_file, "a", newline="", encoding="utf-8") as f:
-            csv_columns = get_csv_columns()
-            writer = csv.DictWriter(f, fieldnames=csv_columns, restval="")
-            # 过滤掉不在字段列表中的键（避免多余字段导致报错）
-            filtered_result = {k: result.get(k, "") for k in csv_columns}
-            writer.writerow(filtered_result)
+        # extrasaction="ignore"过滤掉不在字段列表中的键，restval补齐缺失字段
+        writer.writerow(result)
+
+
+def sync_temp_csv(f, lock):
+    """把缓冲区写入磁盘并fsync（每批次一次，保证断点续爬的检查点持久化）"""
+    with lock:
+        f.flush()
+        os.fsync(f.fileno())
 
 
 # -------------------------- 3. 批量爬取主逻辑（针对482条URL优化） --------------------------
@@ -167,52 +171,61 @@ def batch_crawl_large_scale(input_csv, output_csv, temp_csv):
     print(f"⏳ 预计耗时：{total_to_crawl / MAX_WORKERS * 2:.1f} 秒（估算）\n")
 
     # 3. 多线程批量爬取（分批次处理，避免一次性创建过多线程）
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # 提交所有爬取任务到线程池
-        future_tasks = {
-            executor.submit(crawl_single_api, url_info["url"], url_info["original_row_num"]): 
-            url_info for url_info in all_urls
-        }
-
-        # 实时处理完成的任务，更新进度
-        for future in as_completed(future_tasks):
-            url_info = future_tasks[future]
-            url = url_info["url"]
-            completed_count += 1
-
-            try:
-                # 获取爬取结果
-                result = future.result(timeout=60)  # 超时时间60秒（避免线程挂起）
-                # 写入临时文件
-                write_result_to_csv(result, temp_csv, csv_lock)
-                # 更新统计
-                if result["crawl_status"] == "success":
-                    success_count += 1
-                    print(f"✅ [{completed_count}/{total_to_crawl}] 成功：{url}")
-                else:
+    # 临时文件只打开一次，使用1MB缓冲区，每BATCH_SIZE条刷盘一次
+    temp_f = open(temp_csv, "a", newline="", encoding="utf-8", buffering=1 << 20)
+    writer = csv.DictWriter(temp_f, fieldnames=get_csv_columns(), restval="", extrasaction="ignore")
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # 提交所有爬取任务到线程池
+            future_tasks = {
+                executor.submit(crawl_single_api, job.url, job.original_row_num): job
+                for job in all_urls
+            }
+
+            # 实时处理完成的任务，更新进度
+            for future in as_completed(future_tasks):
+                job = future_tasks[future]
+                url = job.url
+                completed_count += 1
+
+                try:
+                    # 获取爬取结果
+                    result = future.result(timeout=60)  # 超时时间60秒（避免线程挂起）
+                    # 写入临时文件
+                    write_result_to_csv(result, writer, csv_lock)
+                    # 更新统计
+                    if result["crawl_status"] == "success":
+                        success_count += 1
+                        print(f"✅ [{completed_count}/{total_to_crawl}] 成功：{url}")
+                    else:
+                        fail_count += 1
+                        print(f"❌ [{completed_count}/{total_to_crawl}] 失败：{url}（{result['error_msg'][:50]}...）")
+
+                    # 每爬取BATCH_SIZE条，同步一次临时文件并打印进度汇总
+                    if completed_count % BATCH_SIZE == 0 or completed_count == total_to_crawl:
+                        sync_temp_csv(temp_f, csv_lock)
+                        elapsed_time = (datetime.now() - start_time).total_seconds()
+                        avg_time_per_url = elapsed_time / completed_count if completed_count > 0 else 0
+                        remaining_time = avg_time_per_url * (total_to_crawl - completed_count)
+                        print(f"\n📈 进度汇总：已完成{completed_count}/{total_to_crawl}（成功{success_count}，失败{fail_count}）")
+                        print(f"⏱️  已耗时：{elapsed_time:.1f}秒，预计剩余：{remaining_time:.1f}秒\n")
+
+                except Exception as e:
+                    # 捕获线程执行中的异常（如超时、未知错误）
                     fail_count += 1
-                    print(f"❌ [{completed_count}/{total_to_crawl}] 失败：{url}（{result['error_msg'][:50]}...）")
-
-                # 每爬取BATCH_SIZE条，打印一次进度汇总
-                if completed_count % BATCH_SIZE == 0 or completed_count == total_to_crawl:
-                    elapsed_time = (datetime.now() - start_time).total_seconds()
-                    avg_time_per_url = elapsed_time / completed_count if completed_count > 0 else 0
-                    remaining_time = avg_time_per_url * (total_to_crawl - completed_count)
-                    print(f"\n📈 进度汇总：已完成{completed_count}/{total_to_crawl}（成功{success_count}，失败{fail_count}）")
-                    print(f"⏱️  已耗时：{elapsed_time:.1f}秒，预计剩余：{remaining_time:.1f}秒\n")
-
-            except Exception as e:
-                # 捕获线程执行中的异常（如超时、未知错误）
-                fail_count += 1
-                error_result = {
-                    "original_row_num": url_info["original_row_num"],
-                    "url": url,
-                    "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "crawl_status": "failed",
-                    "error_msg": f"线程执行异常：{str(e)}"
-                }
-                write_result_to_csv(error_result, temp_csv, csv_lock)
-                print(f"❌ [{completed_count}/{total_to_crawl}] 异常：{url}（{str(e)[:50]}...）")
+                    error_result = {
+                        "original_row_num": job.original_row_num,
+                        "url": url,
+                        "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "crawl_status": "failed",
+                        "error_msg": f"线程执行异常：{str(e)}"
+                    }
+                    write_result_to_csv(error_result, writer, csv_lock)
+                    print(f"❌ [{completed_count}/{total_to_crawl}] 异常：{url}（{str(e)[:50]}...）")
+    finally:
+        # 中断时也把缓冲区中的结果写盘，保证断点续爬不丢数据
+        sync_temp_csv(temp_f, csv_lock)
+        temp_f.close()
 
     # 4. 爬取完成：生成最终报告 + 合并临时文件到输出文件
     end_time = datetime.now()
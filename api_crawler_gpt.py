@@ -1,28 +1,240 @@
 import sys
 import os
-import json
+import io
 import csv
+import socket
 import time
-import threading
+import asyncio
+import argparse
+from collections import deque, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from visit_gpt4o_fixed import VisitGPT4o  
+from itertools import zip_longest
+from urllib.parse import urlsplit, urlunsplit
+from visit_gpt4o_fixed import VisitGPT4o, build_async_client, json_dumps, json_loads, rate_limited_count
+
+try:
+    # 用PyArrow按列扫描CSV（C++实现），避免csv.DictReader逐行构造dict
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except ImportError:
+    pacsv = None
 
 # -------------------------- 核心配置 --------------------------
 INPUT_CSV = "input.csv"       # URL的输入文件
 OUTPUT_CSV = "output.csv"  # 最终结果输出文件 - 修改文件名
 TEMP_CSV = "api_crawl_temp_gpt5.csv"       # 临时文件（用于断点续爬，避免数据丢失） - 修改文件名
-# 爬取策略配置（针对大数量URL优化）
-MAX_RETRIES = 2                       # 每个URL最多重试2次（减少API调用次数）
-RETRY_DELAY = 2                       # 重试间隔2秒（给API更多时间）
-MAX_WORKERS = 3                       # 线程数：减少到3（避免API限制）
-BATCH_SIZE = 10                       # 每爬取10条URL，同步一次临时文件（更频繁保存）
+# 爬取策略配置（可通过环境变量或命令行参数覆盖）
+MAX_RETRIES = int(os.environ.get("CRAWLER_MAX_RETRIES", 2))          # 每个URL最多重试次数
+RETRY_DELAY = float(os.environ.get("CRAWLER_RETRY_DELAY", 2))        # 重试间隔（秒）
+MAX_WORKERS = int(os.environ.get("CRAWLER_MAX_WORKERS", 10))         # 初始并发任务数（运行中按429比例自动调整）
+MAX_WORKERS_CEILING = int(os.environ.get("CRAWLER_MAX_WORKERS_CEILING", 50))  # 自动调整的并发上限
+BATCH_SIZE = int(os.environ.get("CRAWLER_BATCH_SIZE", 10))           # 每爬取N条URL，同步一次临时文件
+# AIMD并发控制配置
+AIMD_WINDOW = 50                      # 统计最近50次LLM调用结果
+AIMD_BACKOFF_RATIO = 0.1              # 429比例超过10%时并发减半
+AIMD_GROW_INTERVAL = 60               # 连续60秒无429时并发+1
+DNS_PREWARM_WORKERS = 32              # DNS预热线程数
+HOST_MIN_INTERVAL = float(os.environ.get("CRAWLER_HOST_MIN_INTERVAL", 0.1))  # 同一域名两次请求的最小间隔（秒），0表示不限制
+
+
+def parse_args():
+    """命令行参数（未指定时使用上面的默认配置）"""
+    parser = argparse.ArgumentParser(description="使用GPT批量爬取API变更信息")
+    parser.add_argument("--input", default=INPUT_CSV, help="URL输入CSV")
+    parser.add_argument("--output", default=OUTPUT_CSV, help="最终结果CSV")
+    parser.add_argument("--temp", default=TEMP_CSV, help="断点续爬临时CSV")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="初始并发任务数")
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS_CEILING, help="并发上限")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES, help="每个URL最多重试次数")
+    parser.add_argument("--retry-delay", type=float, default=RETRY_DELAY, help="重试间隔（秒）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每N条同步一次临时文件")
+    parser.add_argument("--host-interval", type=float, default=HOST_MIN_INTERVAL, help="同一域名请求最小间隔（秒）")
+    return parser.parse_args()
+
+
+# 待爬任务（namedtuple没有__dict__，比每行一个dict省内存）
+UrlJob = namedtuple("UrlJob", "url original_row_num")
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD并发控制器（替代固定大小的信号量）：
+    - 429信号来自限速器的累计计数（llm内部重试掉的429调用方看不到异常，只能从计数读取）
+    - 最近窗口内429比例超过阈值时，并发数减半
+    - 连续AIMD_GROW_INTERVAL秒没有429时，并发数加1
+    """
 
-# 全局锁（避免多线程写入CSV冲突）
-csv_lock = threading.Lock()
+    def __init__(self, initial, ceiling, rate_limited_count):
+        self.limit = max(1, min(initial, ceiling))
+        self.ceiling = ceiling
+        self._active = 0
+        self._cond = asyncio.Condition()
+        self._outcomes = deque(maxlen=AIMD_WINDOW)
+        self._last_change = time.monotonic()
+        self._rate_limited_count = rate_limited_count  # 返回累计429次数的函数
+        self._seen_rate_limited = rate_limited_count()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    async def record(self):
+        """
+        一次LLM调用结束后调用：上次记录以来新增的每个429记为一次限流，本次调用记为一次未限流，
+        并按AIMD规则调整并发数（每个429只被记录一次，不会被同时在跑的多个任务重复计入）
+        """
+        count = self._rate_limited_count()
+        new_rate_limited = count - self._seen_rate_limited
+        self._seen_rate_limited = count
+        self._outcomes.extend([True] * min(new_rate_limited, AIMD_WINDOW))
+        self._outcomes.append(False)
+        now = time.monotonic()
+        if new_rate_limited:
+            self._last_change = now
+            if len(self._outcomes) >= AIMD_WINDOW // 5 and \
+                    sum(self._outcomes) / len(self._outcomes) > AIMD_BACKOFF_RATIO:
+                self._outcomes.clear()
+                if self.limit > 1:
+                    self.limit = max(1, self.limit // 2)
+                    print(f"⚠️ 429比例过高，并发数下调为 {self.limit}")
+        elif now - self._last_change >= AIMD_GROW_INTERVAL and self.limit < self.ceiling:
+            self.limit += 1
+            self._last_change = now
+            print(f"📈 持续无429，并发数上调为 {self.limit}")
+            async with self._cond:
+                self._cond.notify_all()
+
+
+class HostThrottle:
+    """按域名错开请求：同一netloc相邻两次请求至少间隔min_interval秒，避免并发压到同一站点被封"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = {}  # netloc -> 下一次允许请求的时间
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        if self.min_interval <= 0:
+            return
+        host = urlsplit(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 # -------------------------- 1. 基础工具函数 --------------------------
+def canonicalize_url(url):
+    """规范化URL：去除首尾空白，scheme和域名转小写（路径、参数和锚点保持不变，锚点用于定位API）"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, parts.fragment))
+
+
+def interleave_by_host(jobs):
+    """按域名分桶后轮流取出，使相邻提交的任务尽量来自不同站点"""
+    buckets = defaultdict(deque)
+    for job in jobs:
+        buckets[urlsplit(job.url).netloc].append(job)
+    return [job for group in zip_longest(*buckets.values()) for job in group if job is not None]
+
+
+# 引号内的字段可以包含换行（GPT返回的reason、错误信息等），与csv模块的解析行为一致
+_CSV_PARSE_OPTIONS = pacsv.ParseOptions(newlines_in_values=True) if pacsv is not None else None
+
+
+def read_completed_urls(temp_file):
+    """从临时文件读取已爬取成功的URL集合"""
+    if pacsv is not None:
+        table = pacsv.read_csv(temp_file, parse_options=_CSV_PARSE_OPTIONS, convert_options=pacsv.ConvertOptions(
+            include_columns=["url", "crawl_status"],
+            include_missing_columns=True,  # 缺列时补为空列，结果为空集合
+            column_types={"url": pa.string(), "crawl_status": pa.string()},
+        ))
+        success = table.filter(pc.equal(table["crawl_status"], "success"))
+        return set(pc.utf8_trim_whitespace(success["url"]).to_pylist())
+
+    completed_urls = set()
+    with open(temp_file, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if "url" in reader.fieldnames and "crawl_status" in reader.fieldnames:
+            for row in reader:
+                if row["crawl_status"] == "success":
+                    completed_urls.add(row["url"].strip())
+    return completed_urls
+
+
+def read_input_urls(csv_file):
+    """读取输入CSV的url列（已去除首尾空白），按原始顺序返回"""
+    if pacsv is not None:
+        try:
+            table = pacsv.read_csv(csv_file, parse_options=_CSV_PARSE_OPTIONS, convert_options=pacsv.ConvertOptions(
+                include_columns=["url"], column_types={"url": pa.string()},
+            ))
+        except pa.ArrowKeyError:
+            # 只有缺少url列时报表头错误，其他解析错误原样抛出
+            raise ValueError("输入CSV必须包含'url'表头")
+        return pc.utf8_trim_whitespace(table["url"]).to_pylist()
+
+    with open(csv_file, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if "url" not in reader.fieldnames:
+            raise ValueError("输入CSV必须包含'url'表头")
+        return [row["url"].strip() for row in reader]
+
+
+def collect_hosts(jobs):
+    """收集待爬URL中的所有域名：{(scheme, hostname, port): None}，保持首次出现顺序"""
+    hosts = {}
+    for job in jobs:
+        parts = urlsplit(job.url)
+        if parts.hostname:
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            hosts.setdefault((parts.scheme, parts.hostname, port), None)
+    return list(hosts)
+
+
+def prewarm_dns(hosts):
+    """爬取前用线程池并行解析所有域名（每个域名只解析一次），预热系统DNS缓存"""
+    if not hosts:
+        return
+
+    def resolve(host):
+        _, hostname, port = host
+        try:
+            socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+            return True
+        except OSError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=min(DNS_PREWARM_WORKERS, len(hosts))) as executor:
+        resolved = sum(executor.map(resolve, hosts))
+    print(f"🌐 DNS预热完成：{resolved}/{len(hosts)} 个域名解析成功")
+
+
+async def warm_connections(client, hosts):
+    """对每个域名发一次HEAD请求，提前建立keep-alive连接放入连接池（失败忽略，正式爬取时会重试）"""
+    async def head(host):
+        scheme, hostname, port = host
+        default_port = 443 if scheme == "https" else 80
+        netloc = hostname if port == default_port else f"{hostname}:{port}"
+        try:
+            await client.head(f"{scheme}://{netloc}/", follow_redirects=False)
+        except Exception:
+            pass
+
+    await asyncio.gather(*(head(host) for host in hosts))
+
+
 def load_urls_from_csv(csv_file, temp_file=TEMP_CSV):
     """
     加载URL列表，支持断点续爬：
@@ -32,29 +244,29 @@ def load_urls_from_csv(csv_file, temp_file=TEMP_CSV):
     # 第一步：读取已爬取成功的URL（从临时文件）
     completed_urls = set()
     if os.path.exists(temp_file):
-        with open(temp_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            if "url" in reader.fieldnames and "crawl_status" in reader.fieldnames:
-                for row in reader:
-                    if row["crawl_status"] == "success":
-                        completed_urls.add(row["url"].strip())
+        completed_urls = {canonicalize_url(url) for url in read_completed_urls(temp_file) if url}
         print(f"🔍 发现临时文件，已爬取成功 {len(completed_urls)} 条URL，将跳过这些URL")
 
     # 第二步：读取输入CSV的所有URL，过滤已完成的
-    all_urls = []
     try:
-        with open(csv_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            if "url" not in reader.fieldnames:
-                raise ValueError("输入CSV必须包含'url'表头")
-
-            for row_num, row in enumerate(reader, 2):  # 行号从2开始（表头为1）
-                url = row["url"].strip()
-                if url and url not in completed_urls:  # 跳过空URL和已完成的URL
-                    all_urls.append({
-                        "url": url,
-                        "original_row_num": row_num  # 记录原始行号，便于核对
-                    })
+        if not os.path.exists(csv_file):
+            raise FileNotFoundError(csv_file)
+        urls = read_input_urls(csv_file)
+
+        # 规范化并去重（保留首次出现的行号），跳过空URL和已完成的URL
+        first_rows = {}
+        for row_num, url in enumerate(urls, 2):  # 行号从2开始（表头为1）
+            if url:
+                first_rows.setdefault(canonicalize_url(url), row_num)
+        duplicate_count = sum(1 for url in urls if url) - len(first_rows)
+        if duplicate_count:
+            print(f"🔁 输入CSV中有 {duplicate_count} 条重复URL，已去重")
+
+        all_urls = interleave_by_host([
+            UrlJob(url, row_num)  # 记录原始行号，便于核对
+            for url, row_num in first_rows.items()
+            if url not in completed_urls
+        ])
 
         total_input = len(all_urls) + len(completed_urls)
         print(f"✅ 从输入CSV加载完成：总计 {total_input} 条URL，待爬取 {len(all_urls)} 条，已完成 {len(completed_urls)} 条")
@@ -72,29 +284,32 @@ def init_temp_csv(temp_file=TEMP_CSV):
     """初始化临时CSV文件（用于断点续爬）"""
     if not os.path.exists(temp_file):
         with open(temp_file, "w", newline="", encoding="utf-8") as f:
-            csv_columns = get_csv_columns()
-            writer = csv.DictWriter(f, fieldnames=csv_columns, restval="")
+            writer = csv.DictWriter(f, fieldnames=get_csv_columns(), restval="")
             writer.writeheader()
     return temp_file
 
 
+# CSV输出字段（固定字段顺序，避免错乱；模块级元组，只构建一次）
+_CSV_COLUMNS = (
+    # 基础定位信息
+    "original_row_num", "url", "crawl_time", "crawl_status", "error_msg",
+    # API核心信息
+    "api", "package", "language",
+    # API变更信息
+    "deprecated_in", "removed_in", "replaced_by", "change_type", "reason",
+    # 来源信息
+    "source"
+)
+
+
 def get_csv_columns():
     """定义CSV输出字段（固定字段顺序，避免错乱）"""
-    return [
-        # 基础定位信息
-        "original_row_num", "url", "crawl_time", "crawl_status", "error_msg",
-        # API核心信息
-        "api", "package", "language",
-        # API变更信息
-        "deprecated_in", "removed_in", "replaced_by", "change_type", "reason",
-        # 来源信息
-        "source"
-    ]
-
-
-# -------------------------- 2. 爬取核心函数（支持多线程） --------------------------
-def crawl_single_api(url, original_row_num):
-    """单URL爬取函数（线程安全，返回爬取结果字典） - 使用GPT-5"""
+    return _CSV_COLUMNS
+
+
+# -------------------------- 2. 爬取核心函数（asyncio并发） --------------------------
+async def crawl_single_api(client, visit_tool, limiter, throttle, url, original_row_num):
+    """单URL爬取协程（由AIMD控制器限制并发，返回爬取结果字典） - 使用GPT-5"""
     result = {
         "original_row_num": original_row_num,
         "url": url,
@@ -103,48 +318,128 @@ def crawl_single_api(url, original_row_num):
         "error_msg": ""
     }
 
-    for retry in range(MAX_RETRIES):
-        try:
-            visit_tool = VisitGPT4o()  # 使用VisitGPT4o替代Visit
-            crawl_params = json.dumps({
-                "url": url,
-                "goal": "只提取页面中明确存在的API变更信息。如果页面没有明确的变更说明，change_type和reason必须为空。严禁编造或推断任何信息。"
-            })
-            result_str = visit_tool.call(crawl_params)
-
-            if not result_str.strip():
-                raise ValueError("爬取结果为空字符串")
-
-            # 合并爬取到的API信息
-            api_data = json.loads(result_str)
-            result.update(api_data)
-            result["crawl_status"] = "success"
-            result["error_msg"] = ""
-            return result  # 爬取成功，直接返回
-
-        except Exception as e:
-            error_msg = f"第{retry+1}次重试失败：{str(e)}"
-            result["error_msg"] = error_msg
-            if retry < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)  # 未到最大重试次数，等待后重试
+    crawl_params = json_dumps({
+        "url": url,
+        "goal": "只提取页面中明确存在的API变更信息。如果页面没有明确的变更说明，change_type和reason必须为空。严禁编造或推断任何信息。"
+    })
+
+    async with limiter:
+        for retry in range(MAX_RETRIES):
+            try:
+                await throttle.wait(url)
+                result_str = await visit_tool.call_async(client, crawl_params)
+
+                if not result_str.strip():
+                    raise ValueError("爬取结果为空字符串")
+
+                # 合并爬取到的API信息
+                api_data = json_loads(result_str)
+                result.update(api_data)
+                result["crawl_status"] = "success"
+                result["error_msg"] = ""
+                await limiter.record()
+                return result  # 爬取成功，直接返回
+
+            except Exception as e:
+                await limiter.record()
+                error_msg = f"第{retry+1}次重试失败：{str(e)}"
+                result["error_msg"] = error_msg
+                if retry < MAX_RETRIES - 1:
+                    await asyncio.sleep(RETRY_DELAY)  # 未到最大重试次数，等待后重试
 
     # 所有重试失败，返回失败结果
     result["error_msg"] = f"超过{MAX_RETRIES}次重试：{result['error_msg']}"
     return result
 
 
-def write_result_to_csv(result, csv_file, lock):
-    """线程安全的CSV写入函数（通过锁避免多线程写入冲突）"""
-    with lock:
-        with open(csv_file, "a", newline="", encoding="utf-8") as f:
-            csv_columns = get_csv_columns()
-            writer = csv.DictWriter(f, fieldnames=csv_columns, restval="")
-            # 过滤掉不在字段列表中的键（避免多余字段导致报错）
-            filtered_result = {k: result.get(k, "") for k in csv_columns}
-            writer.writerow(filtered_result)
+async def crawl_job(client, visit_tool, limiter, throttle, job):
+    """包装单个任务：未捕获的异常转换为失败结果，保证主循环总能拿到对应URL的记录"""
+    try:
+        return await crawl_single_api(client, visit_tool, limiter, throttle, job.url, job.original_row_num)
+    except Exception as e:
+        return {
+            "original_row_num": job.original_row_num,
+            "url": job.url,
+            "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "crawl_status": "failed",
+            "error_msg": f"任务执行异常：{str(e)}"
+        }
+
+
+def format_row(result):
+    """把一条结果序列化为CSV行的UTF-8字节（按固定字段顺序，缺失字段补空，多余字段丢弃）"""
+    buf = io.StringIO()
+    csv.writer(buf).writerow([result.get(col, "") for col in _CSV_COLUMNS])
+    return buf.getvalue().encode("utf-8")
+
+
+def open_append_fd(path):
+    """以追加模式打开临时文件，返回底层文件描述符（绕过文本层，直接写字节）"""
+    return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+
+
+def flush_rows_to_fd(fd, pending):
+    """把累积的已序列化行合并后一次性写入文件描述符（处理部分写入），并fsync作为断点续爬检查点"""
+    if not pending:
+        return
+    view = memoryview(b"".join(pending))
+    while view:
+        view = view[os.write(fd, view):]
+    os.fsync(fd)
+    pending.clear()
 
 
 # -------------------------- 3. 批量爬取主逻辑（针对482条URL优化） --------------------------
+async def crawl_all(all_urls, temp_csv, start_time, hosts=()):
+    """在一个事件循环中并发爬取所有URL，结果按BATCH_SIZE批量写入临时文件"""
+    total_to_crawl = len(all_urls)
+    completed_count = 0
+    success_count = 0
+    fail_count = 0
+
+    visit_tool = VisitGPT4o()  # 所有任务共享一个实例（HTTP连接池和OpenAI客户端均可复用）
+    limiter = AdaptiveConcurrency(MAX_WORKERS, MAX_WORKERS_CEILING, rate_limited_count)
+    throttle = HostThrottle(HOST_MIN_INTERVAL)
+    pending = []
+    temp_fd = open_append_fd(temp_csv)
+    try:
+        async with build_async_client(MAX_WORKERS_CEILING) as client:  # 连接池上限与并发上限一致
+            await warm_connections(client, hosts[:MAX_WORKERS_CEILING])  # 预热数量不超过连接池上限
+            # all_urls已按域名交错排列，相邻任务尽量落在不同站点
+            jobs = [crawl_job(client, visit_tool, limiter, throttle, url_job) for url_job in all_urls]
+            try:
+                # 实时处理完成的任务，更新进度
+                for job in asyncio.as_completed(jobs):
+                    result = await job
+                    url = result["url"]
+                    completed_count += 1
+                    pending.append(format_row(result))  # 结果立即序列化为字节，批量写入时只需拼接
+
+                    # 更新统计
+                    if result["crawl_status"] == "success":
+                        success_count += 1
+                        print(f"✅ [{completed_count}/{total_to_crawl}] 成功：{url}")
+                    else:
+                        fail_count += 1
+                        print(f"❌ [{completed_count}/{total_to_crawl}] 失败：{url}（{result['error_msg'][:50]}...）")
+
+                    # 每爬取BATCH_SIZE条，同步一次临时文件并打印进度汇总
+                    if completed_count % BATCH_SIZE == 0 or completed_count == total_to_crawl:
+                        flush_rows_to_fd(temp_fd, pending)
+                        elapsed_time = (datetime.now() - start_time).total_seconds()
+                        avg_time_per_url = elapsed_time / completed_count if completed_count > 0 else 0
+                        remaining_time = avg_time_per_url * (total_to_crawl - completed_count)
+                        print(f"\n📈 进度汇总：已完成{completed_count}/{total_to_crawl}（成功{success_count}，失败{fail_count}）")
+                        print(f"⏱️  已耗时：{elapsed_time:.1f}秒，预计剩余：{remaining_time:.1f}秒\n")
+            finally:
+                # 中断时也把已完成的结果写盘，保证断点续爬不丢数据
+                flush_rows_to_fd(temp_fd, pending)
+    finally:
+        os.close(temp_fd)
+
+    return success_count, fail_count
+
+
 def batch_crawl_large_scale(input_csv, output_csv, temp_csv):
     # 1. 初始化：加载待爬URL、初始化临时文件
     all_urls = load_urls_from_csv(input_csv, temp_csv)
@@ -156,65 +451,19 @@ def batch_crawl_large_scale(input_csv, output_csv, temp_csv):
         sys.exit(0)
 
     init_temp_csv(temp_csv)  # 确保临时文件存在且表头正确
+    hosts = collect_hosts(all_urls)
+    prewarm_dns(hosts)  # 每个域名只解析一次，避免各连接重复付出DNS开销
 
     # 2. 初始化进度统计
     total_to_crawl = len(all_urls)
-    completed_count = 0
-    success_count = 0
-    fail_count = 0
     start_time = datetime.now()
 
     print(f"\n🚀 开始批量爬取（使用GPT-5）：{start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"📊 配置：线程数={MAX_WORKERS}，重试次数={MAX_RETRIES}，每{MAX_WORKERS}条同步临时文件")
+    print(f"📊 配置：初始并发数={MAX_WORKERS}（上限{MAX_WORKERS_CEILING}，按429比例自动调整），重试次数={MAX_RETRIES}，每{BATCH_SIZE}条同步临时文件")
     print(f"⏳ 预计耗时：{total_to_crawl / MAX_WORKERS * 2:.1f} 秒（估算）\n")
 
-    # 3. 多线程批量爬取（分批次处理，避免一次性创建过多线程）
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # 提交所有爬取任务到线程池
-        future_tasks = {
-            executor.submit(crawl_single_api, url_info["url"], url_info["original_row_num"]):
-            url_info for url_info in all_urls
-        }
-
-        # 实时处理完成的任务，更新进度
-        for future in as_completed(future_tasks):
-            url_info = future_tasks[future]
-            url = url_info["url"]
-            completed_count += 1
-
-            try:
-                # 获取爬取结果
-                result = future.result(timeout=60)  # 超时时间60秒（避免线程挂起）
-                # 写入临时文件
-                write_result_to_csv(result, temp_csv, csv_lock)
-                # 更新统计
-                if result["crawl_status"] == "success":
-                    success_count += 1
-                    print(f"✅ [{completed_count}/{total_to_crawl}] 成功：{url}")
-                else:
-                    fail_count += 1
-                    print(f"❌ [{completed_count}/{total_to_crawl}] 失败：{url}（{result['error_msg'][:50]}...）")
-
-                # 每爬取BATCH_SIZE条，打印一次进度汇总
-                if completed_count % BATCH_SIZE == 0 or completed_count == total_to_crawl:
-                    elapsed_time = (datetime.now() - start_time).total_seconds()
-                    avg_time_per_url = elapsed_time / completed_count if completed_count > 0 else 0
-                    remaining_time = avg_time_per_url * (total_to_crawl - completed_count)
-                    print(f"\n📈 进度汇总：已完成{completed_count}/{total_to_crawl}（成功{success_count}，失败{fail_count}）")
-                    print(f"⏱️  已耗时：{elapsed_time:.1f}秒，预计剩余：{remaining_time:.1f}秒\n")
-
-            except Exception as e:
-                # 捕获线程执行中的异常（如超时、未知错误）
-                fail_count += 1
-                error_result = {
-                    "original_row_num": url_info["original_row_num"],
-                    "url": url,
-                    "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "crawl_status": "failed",
-                    "error_msg": f"线程执行异常：{str(e)}"
-                }
-                write_result_to_csv(error_result, temp_csv, csv_lock)
-                print(f"❌ [{completed_count}/{total_to_crawl}] 异常：{url}（{str(e)[:50]}...）")
+    # 3. asyncio并发爬取（单线程事件循环，AIMD控制器限制同时进行的任务数）
+    success_count, fail_count = asyncio.run(crawl_all(all_urls, temp_csv, start_time, hosts))
 
     # 4. 爬取完成：生成最终报告 + 合并临时文件到输出文件
     end_time = datetime.now()
@@ -248,15 +497,24 @@ if __name__ == "__main__":
     current_dir = os.path.dirname(os.path.abspath(__file__))
     sys.path.append(current_dir)
 
-    # 2. 检查依赖文件
-    if not os.path.exists(INPUT_CSV):
-        print(f"❌ 输入CSV文件不存在：{INPUT_CSV}")
+    # 2. 读取命令行参数（覆盖默认配置）
+    args = parse_args()
+    MAX_WORKERS = args.workers
+    MAX_WORKERS_CEILING = max(args.max_workers, args.workers)
+    MAX_RETRIES = args.retries
+    RETRY_DELAY = args.retry_delay
+    BATCH_SIZE = args.batch_size
+    HOST_MIN_INTERVAL = args.host_interval
+
+    # 3. 检查依赖文件
+    if not os.path.exists(args.input):
+        print(f"❌ 输入CSV文件不存在：{args.input}")
         sys.exit(1)
 
-    # 3. 启动大规模批量爬取（使用GPT-5）
+    # 4. 启动大规模批量爬取（使用GPT-5）
     print("🤖 使用GPT-5进行API信息提取")
     batch_crawl_large_scale(
-        input_csv=INPUT_CSV,
-        output_csv=OUTPUT_CSV,
-        temp_csv=TEMP_CSV
-    )
\ No newline at end of file
+        input_csv=args.input,
+        output_csv=args.output,
+        temp_csv=args.temp
+    )
@@ -7,8 +7,55 @@
 
 import pandas as pd
 import os
+import csv
 from datetime import datetime
 
+try:
+    # PyArrow的CSV读写与过滤均为多线程C++实现，比pandas逐列处理快得多
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except ImportError:
+    pacsv = None
+
+
+def write_csv_like_pandas(table, output_file):
+    """
+    按DataFrame.to_csv(index=False)的格式写出PyArrow表：只在需要时加引号，空值写为空字符串
+    （pacsv.write_csv即使quoting_style="needed"也会给所有字符串加引号，输出格式与原来不同）
+    """
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(table.column_names)
+        for batch in table.to_batches():
+            columns = [column.to_pylist() for column in batch.columns]
+            writer.writerows(zip(*columns))
+
+
+def filter_with_pyarrow(input_file, output_file, required_columns):
+    """使用PyArrow读取、过滤并写出CSV，全程不经过pandas"""
+    table = pacsv.read_csv(
+        input_file,
+        read_options=pacsv.ReadOptions(block_size=1 << 20, use_threads=True),
+        # reason等自由文本列的引号内可以包含换行（与pandas的解析行为一致）
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        # 与pandas保持一致：空字符串视为空值
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+    )
+    missing_columns = [col for col in required_columns if col not in table.column_names]
+    if missing_columns:
+        return table.num_rows, None, None, missing_columns
+
+    all_empty = pc.and_(
+        pc.and_(pc.is_null(table['deprecated_in']), pc.is_null(table['removed_in'])),
+        pc.is_null(table['replaced_by'])
+    )
+    filtered = table.filter(pc.invert(all_empty))
+    write_csv_like_pandas(filtered, output_file)
+
+    preview_columns = [col for col in ['original_row_num', 'api', 'package'] if col in table.column_names]
+    removed_preview = table.filter(all_empty).slice(0, 5).select(preview_columns).to_pylist()
+    return table.num_rows, filtered, removed_preview, []
+
 
 def preprocess_csv():
     """预处理CSV文件，过滤空值行"""
@@ -24,51 +71,60 @@ def preprocess_csv():
         return
 
     try:
-        # 读取CSV文件
-        print(f"📂 读取文件: {input_file}")
-        df = pd.read_csv(input_file)
-
-        # 显示原始数据统计
-        original_count = len(df)
-        print(f"📊 原始数据行数: {original_count}")
-
         # 检查列是否存在
         required_columns = ['deprecated_in', 'removed_in', 'replaced_by']
-        missing_columns = [col for col in required_columns if col not in df.columns]
 
-        if missing_columns:
-            print(f"❌ 缺少必要的列: {missing_columns}")
-            return
-
-        # 过滤条件：deprecated_in，removed_in和replaced_by列同时为空
-        # 空值包括：NaN
-        mask = ~(
-            df['deprecated_in'].isna() &
-            df['removed_in'].isna() &
-            df['replaced_by'].isna()
-        )
-
-        # 应用过滤
-        filtered_df = df[mask]
+        # 读取CSV文件并过滤：deprecated_in，removed_in和replaced_by列同时为空则删除
+        # 空值包括：NaN/空字符串
+        print(f"📂 读取文件: {input_file}")
+        if pacsv is not None:
+            original_count, filtered, removed_preview, missing_columns = filter_with_pyarrow(
+                input_file, output_file, required_columns
+            )
+            print(f"📊 原始数据行数: {original_count}")
+            if missing_columns:
+                print(f"❌ 缺少必要的列: {missing_columns}")
+                return
+            filtered_count = filtered.num_rows
+            null_counts = {col: filtered[col].null_count for col in required_columns}
+            filtered_df = filtered.to_pandas()
+        else:
+            df = pd.read_csv(input_file)
+            original_count = len(df)
+            print(f"📊 原始数据行数: {original_count}")
+
+            missing_columns = [col for col in required_columns if col not in df.columns]
+            if missing_columns:
+                print(f"❌ 缺少必要的列: {missing_columns}")
+                return
+
+            mask = ~(
+                df['deprecated_in'].isna() &
+                df['removed_in'].isna() &
+                df['replaced_by'].isna()
+            )
+            filtered_df = df[mask]
+            filtered_df.to_csv(output_file, index=False, encoding='utf-8')
+            filtered_count = len(filtered_df)
+            # 一次isna().sum()得到各列空值数（Series，可按列名索引）
+            null_counts = filtered_df[required_columns].isna().sum()
+            # 只取前5行和预览需要的列，避免对整个被删除子集构造dict
+            preview_columns = [col for col in ['original_row_num', 'api', 'package'] if col in df.columns]
+            removed_preview = df[~mask].head(5)[preview_columns].to_dict('records')
 
         # 显示过滤结果统计
-        filtered_count = len(filtered_df)
         removed_count = original_count - filtered_count
 
         print(f"📊 过滤后数据行数: {filtered_count}")
         print(f"🗑️ 删除的数据行数: {removed_count}")
         print(f"📈 保留率: {(filtered_count/original_count)*100:.1f}%")
-
-        # 保存过滤后的数据
-        filtered_df.to_csv(output_file, index=False, encoding='utf-8')
         print(f"💾 过滤后数据已保存到: {output_file}")
 
         # 显示一些被删除行的示例
         if removed_count > 0:
             print("\n📝 被删除行的示例（前5行）:")
-            removed_rows = df[~mask].head()
-            for idx, row in removed_rows.iterrows():
-                print(f"  行 {row['original_row_num']}: {row['api']} - {row['package']}")
+            for row in removed_preview:
+                print(f"  行 {row.get('original_row_num')}: {row.get('api')} - {row.get('package')}")
 
         # 显示过滤后数据的统计
         print(f"\n📊 过滤后数据统计:")
@@ -76,8 +132,8 @@ def preprocess_csv():
 
         # 统计各个列的非空值数量
         for col in required_columns:
-            non_empty_count = filtered_df[col].notna().sum()
-            empty_count = filtered_df[col].isna().sum()
+            empty_count = null_counts[col]
+            non_empty_count = filtered_count - empty_count
             print(f"  {col}: 非空值={non_empty_count}, 空值={empty_count}")
 
         print(f"\n✅ 预处理完成！")
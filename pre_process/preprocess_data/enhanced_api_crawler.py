@@ -7,15 +7,54 @@ Enhanced API Crawler with Smart Identification
 
 import sys
 import os
+import re
 import json
 import csv
 import time
-import threading
+import shelve
+import argparse
+import asyncio
+import hashlib
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urlparse
+from functools import lru_cache
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+import httpx
+import pandas as pd
 from bs4 import BeautifulSoup
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI
+try:
+    # C实现的HTML解析器（lexbor），比html.parser快一个数量级
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    # orjson（Rust实现）的序列化/反序列化比标准库json快数倍，未安装时回退到json
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False）"""
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False）"""
+        return json.dumps(obj, ensure_ascii=False)
+try:
+    # 安装brotli后可以接受br压缩（httpx自动解码）
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+try:
+    # 安装httpx[http2]（h2包）后启用HTTP/2，同一文档站点的并发请求复用一条连接
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
 
 # -------------------------- 核心配置 --------------------------
 INPUT_CSV = "pre_data.csv"  # URL的输入文件（可修改为React等）
@@ -25,26 +64,134 @@ TEMP_CSV = "enhanced_api_crawl_temp.csv"  # 临时文件（用于断点续爬）
 # 爬取策略配置
 MAX_RETRIES = 3
 RETRY_DELAY = 1
-MAX_WORKERS = 8
+RETRYABLE_STATUS_CODES = (408, 429)  # 可以重试的4xx状态码（其余4xx如404/410重试也不会成功）
+# 并发配置（网络/LLM延迟密集型任务，按网络并发而不是CPU核数设置；可通过环境变量或命令行参数覆盖）
+MAX_WORKERS = int(os.environ.get("CRAWLER_WORKERS", 64))                    # 同时进行的URL任务数
+HTTP_CONCURRENCY = int(os.environ.get("CRAWLER_HTTP_CONCURRENCY", 32))      # 同时进行的页面请求数
+GPT_CONCURRENCY = int(os.environ.get("CRAWLER_GPT_CONCURRENCY", 16))        # 同时进行的GPT调用数
 BATCH_SIZE = 50
+# GPT识别只用到标题和各级标题；正文只在调试时保留前N个字符（0表示不提取正文）
+CONTENT_PREVIEW_CHARS = 0
+# URL本身已能高置信度确定API（如#锚点）时，跳过页面爬取和GPT识别；
+# 只对#锚点就是API名称的站点生效（react.dev等站点的锚点是#usage、#reference之类的章节名）
+SKIP_GPT_FOR_URL_MATCH = True
+URL_ONLY_CONFIDENCE = 0.9
+URL_ONLY_DOMAINS = frozenset({'lodash.com'})  # 同时匹配子域名
+# HTTP连接池配置
+HTTP_KEEPALIVE_CONNECTIONS = 64  # 空闲时保留的keep-alive连接数
+HTTP_KEEPALIVE_EXPIRY = 30       # 空闲连接保留时间（秒），覆盖GPT识别期间的空档
+HTTP_CONNECT_RETRIES = 2         # 建立连接失败时由传输层直接重试（不经过上层重试循环的sleep）
+# 页面缓存配置（保存解析结果和ETag/Last-Modified，重跑时发条件请求，304时不再下载和解析）
+HTTP_CACHE_FILE = ".http_cache"  # 页面缓存文件（shelve）
+HTTP_CACHE_EXPIRE = 86400        # 缓存有效期（秒），过期后重新完整下载
 
 # Azure OpenAI配置
 AZURE_ENDPOINT = "https://test-openai-startup.openai.azure.com/"
 AZURE_DEPLOYMENT = "gpt-4o"
 AZURE_API_KEY = "xxx"
-
-# 全局锁（避免多线程写入CSV冲突）
-csv_lock = threading.Lock()
+AZURE_API_VERSION = "2024-02-15-preview"
+# Azure OpenAI Batch API配置（需要Global-Batch类型的部署；一次提交全部请求，费用约为实时调用的50%，
+# 但任务最长可能要等24小时才完成，默认关闭，通过--batch-api开启）
+USE_BATCH_API = False
+BATCH_API_MIN_URLS = 20  # 待识别URL少于该数量时仍逐条实时调用
+AZURE_BATCH_API_VERSION = "2024-10-21"  # Batch接口需要的API版本
+BATCH_INPUT_FILE = "enhanced_gpt_batch_input.jsonl"
+BATCH_POLL_INTERVAL = 30  # 轮询批处理任务状态的间隔（秒）
+GPT_CACHE_FILE = ".gpt_cache"  # GPT识别结果的磁盘缓存（shelve），断点续爬时直接复用
+# 实时调用时多个URL合并到一个提示词中识别（1表示逐条调用）
+GPT_MAX_OUTPUT_TOKENS = 4096    # 模型单次输出token上限，max_tokens不能超过该值
+GPT_GROUP_TOKENS_PER_URL = 400  # 合并调用时每个URL预留的输出token数
+# 每次调用最多识别的URL数，凑满立即发送；按输出上限换算，保证每个URL都有预留的输出token
+GPT_GROUP_SIZE = min(20, GPT_MAX_OUTPUT_TOKENS // GPT_GROUP_TOKENS_PER_URL)
+GPT_GROUP_FLUSH_SECONDS = 2     # 未凑满时最多等待的时间（秒）
+
+# 预编译的API识别正则（模块级只编译一次）
+_FRAGMENT_RE = re.compile(r'^([a-zA-Z][\w\.]*)')
+# 常见的API模式：(正则, 结果前缀)，按优先级排列；与原实现一致全部忽略大小写
+_API_PATTERNS = [
+    (re.compile(r'_([a-zA-Z][\w]*)', re.IGNORECASE), '_'),        # Lodash模式: _.functionName
+    (re.compile(r'use([A-Z]\w*)', re.IGNORECASE), 'use'),          # React Hook模式: useHookName
+    (re.compile(r'react\.([A-Z]\w*)', re.IGNORECASE), 'react.'),  # React API模式: React.Component
+    (re.compile(r'\b([A-Z]\w*)\b', re.IGNORECASE), ''),           # 组件模式: ComponentName
+]
+
+# 页面解析时需要的标签（<title>和h1-h6），一次遍历全部取出
+PAGE_TAGS = ['title', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+PAGE_TAGS_SELECTOR = ', '.join(PAGE_TAGS)
+
+# 结果写入队列配置（单个写入任务独占文件句柄）
+RESULT_QUEUE_SIZE = 256  # 队列上限，写入跟不上时爬取任务会等待
+WRITE_BATCH_SIZE = 32    # 写入任务每次最多合并的结果数
+WRITE_BUFFER_SIZE = 1 << 20  # 临时CSV的写缓冲区（1MB），小写入在用户态合并
+FLUSH_EVERY_ROWS = 1000      # 每写入N行刷新一次到磁盘（中断时最多重爬N条）
+
+
+# 最近一次格式化的爬取时间：[时间戳（秒）, 格式化字符串]
+_crawl_time_cache = [None, '']
+
+
+def crawl_timestamp() -> str:
+    """当前时间的"%Y-%m-%d %H:%M:%S"字符串；同一秒内的结果直接复用，不重复格式化"""
+    now = int(time.time())
+    if now != _crawl_time_cache[0]:
+        _crawl_time_cache[0] = now
+        _crawl_time_cache[1] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+    return _crawl_time_cache[1]
+
+
+# -------------------------- 文档站点的路径解析 --------------------------
+def _react_path(path_parts: List[str]) -> str:
+    """React文档：取最后一个非通用目录名（Hook名称或组件名称）"""
+    for part in reversed(path_parts):
+        if part and not part in ['reference', 'docs', 'api', 'hooks']:
+            return part
+    return ''
+
+
+def _lodash_path(path_parts: List[str]) -> str:
+    """Lodash文档：函数通常是_.开头或者纯函数名"""
+    for part in reversed(path_parts):
+        if part and part not in ['docs', 'api']:
+            if not part.startswith('_'):
+                return f"_{part}"
+            return part
+    return ''
+
+
+# 域名 -> 路径解析函数（可添加其他文档的特殊处理）
+_DOMAIN_HANDLERS = {
+    'react.dev': _react_path,
+    'reactjs.org': _react_path,
+    'lodash.com': _lodash_path,
+}
+
+
+@lru_cache(maxsize=1024)
+def _is_url_only_domain(domain: str) -> bool:
+    """域名（含子域名）的#锚点是否就是API名称"""
+    labels = domain.lower().split(':')[0].split('.')
+    return any('.'.join(labels[i:]) in URL_ONLY_DOMAINS for i in range(len(labels) - 1))
+
+
+@lru_cache(maxsize=1024)
+def _domain_handler(domain: str):
+    """按域名查找路径解析函数（同时匹配子域名，如legacy.reactjs.org），结果按域名缓存"""
+    labels = domain.lower().split(':')[0].split('.')
+    for i in range(len(labels) - 1):
+        handler = _DOMAIN_HANDLERS.get('.'.join(labels[i:]))
+        if handler:
+            return handler
+    return None
 
 
 class EnhancedAPICrawler:
     def __init__(self):
         # 初始化Azure OpenAI客户端
         try:
-            self.client = AzureOpenAI(
+            self.client = AsyncAzureOpenAI(
                 azure_endpoint=AZURE_ENDPOINT,
                 api_key=AZURE_API_KEY,
-                api_version="2024-02-15-preview"
+                api_version=AZURE_API_VERSION
             )
             self.use_gpt = True
             print("✅ GPT-4o API已启用 - 智能API识别模式")
@@ -52,23 +199,90 @@ class EnhancedAPICrawler:
             print(f"⚠️ GPT-4o API初始化失败: {e}，将使用基础识别")
             self.use_gpt = False
 
-        # 初始化HTTP客户端
-        import requests
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        if self.use_gpt:
+            # 页面内容相同（如只差?utm参数）的URL复用识别结果，跨运行持久化；
+            # 放在客户端初始化之外，缓存文件打不开时直接报错，而不是悄悄关闭GPT识别
+            self.gpt_cache = shelve.open(GPT_CACHE_FILE)
+            self.cache_hits = 0
+
+        # 初始化异步HTTP客户端（所有任务共享连接池，保持keep-alive，接受压缩响应）
+        self.session = httpx.AsyncClient(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept-Encoding': ACCEPT_ENCODING
+            },
+            timeout=httpx.Timeout(30.0),
+            # 自定义transport时，连接池上限和http2必须设置在transport上
+            transport=httpx.AsyncHTTPTransport(
+                retries=HTTP_CONNECT_RETRIES,
+                http2=HTTP2_ENABLED,
+                limits=httpx.Limits(
+                    max_connections=HTTP_CONCURRENCY,
+                    max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+                ),
+            ),
+            follow_redirects=True,  # 与requests默认行为一致
+        )
+        # 页面请求和GPT调用分别限流：GPT响应慢时不会占满HTTP并发，反之亦然
+        self.http_semaphore = asyncio.Semaphore(HTTP_CONCURRENCY)
+        self.gpt_semaphore = asyncio.Semaphore(GPT_CONCURRENCY)
+        # 等待合并识别的条目：[((url, api_from_url, page_content), future)]
+        self.gpt_pending = []
+        self.gpt_flush_timer = None
+        self.gpt_group_tasks = set()
+        # 页面缓存：{url: {'etag', 'last_modified', 'cached_at', 'page'}}
+        self.http_cache = shelve.open(HTTP_CACHE_FILE)
+        self.not_modified_hits = 0
+
+    async def aclose(self):
+        """关闭HTTP连接池和GPT客户端"""
+        if self.gpt_flush_timer is not None:
+            self.gpt_flush_timer.cancel()
+        await self.session.aclose()
+        self.http_cache.close()
+        if self.not_modified_hits:
+            print(f"💾 页面未修改（304）{self.not_modified_hits} 次，直接复用缓存的解析结果")
+        if self.use_gpt:
+            await self.client.close()
+            self.gpt_cache.close()
+            if self.cache_hits:
+                print(f"💾 GPT缓存命中 {self.cache_hits} 次")
+
+    def identification_cache_key(self, api_from_url: str, page_content: Dict) -> str:
+        """GPT识别结果的缓存键：URL解析出的API + 标题 + 前3个标题的哈希
+        （包含api_from_url，避免同一页面不同#锚点的API共用结果）"""
+        headings = page_content.get('headings', [])[:3]
+        text = "|".join([api_from_url, page_content.get('title', '')] + [h['text'] for h in headings])
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def get_cached_identification(self, api_from_url: str, page_content: Dict):
+        """查询缓存，命中时返回识别结果的副本，否则返回None
+        （缓存键不含URL，副本中不带source，由merge_api_data填入当前URL）"""
+        cached = self.gpt_cache.get(self.identification_cache_key(api_from_url, page_content))
+        if cached is not None:
+            self.cache_hits += 1
+            result = dict(cached)
+            result.pop('source', None)  # 旧版本缓存中可能带有首次识别时的URL
+            return result
+        return None
+
+    def cache_identification(self, api_from_url: str, page_content: Dict, result: Dict[str, Any]):
+        """保存GPT识别结果（不保存source：同一缓存条目会被不同URL复用）"""
+        cached = dict(result)
+        cached.pop('source', None)
+        self.gpt_cache[self.identification_cache_key(api_from_url, page_content)] = cached
 
     def extract_api_from_url(self, url: str) -> Dict[str, str]:
         """从URL中提取API信息的多种策略"""
+        # 解析URL结构（urlsplit不再拆分;params，比urlparse少一次扫描）
+        parsed = urlsplit(url)
         result = {
             'api_name': '',
             'confidence': 0.0,
-            'method': 'none'
+            'method': 'none',
+            'domain': parsed.netloc.lower()  # 供_result_from_url_only判断包名，避免重复解析URL
         }
-
-        # 解析URL结构
-        parsed = urlparse(url)
         path_parts = parsed.path.strip('/').split('/')
 
         # 策略1: Fragment/Hash识别
@@ -114,7 +328,7 @@ class EnhancedAPICrawler:
                 clean_fragment = clean_fragment[len(prefix):]
 
         # 提取第一个有效的标识符
-        match = re.match(r'^([a-zA-Z][\w\.]*)', clean_fragment)
+        match = _FRAGMENT_RE.match(clean_fragment)
         if match:
             api_name = match.group(1)
             # 添加_前缀（如果缺失）
@@ -129,22 +343,12 @@ class EnhancedAPICrawler:
         if not path_parts:
             return ''
 
-        # React文档的特殊处理
-        if 'react.dev' in domain or 'reactjs.org' in domain:
-            for part in reversed(path_parts):
-                if part and not part in ['reference', 'docs', 'api', 'hooks']:
-                    return part
-
-        # Lodash文档的特殊处理
-        if 'lodash.com' in domain:
-            for part in reversed(path_parts):
-                if part and part not in ['docs', 'api']:
-                    # Lodash函数通常是_.开头或者纯函数名
-                    if not part.startswith('_'):
-                        return f"_{part}"
-                    return part
-
-        #可添加其他文档的特殊处理
+        # 特定文档站点的处理（React、Lodash等，见_DOMAIN_HANDLERS）
+        handler = _domain_handler(domain)
+        if handler:
+            api_name = handler(path_parts)
+            if api_name:
+                return api_name
 
         # 通用路径提取
         for part in reversed(path_parts):
@@ -167,43 +371,149 @@ class EnhancedAPICrawler:
 
         return ''
 
-    def crawl_page_content(self, url: str) -> Dict[str, Any]:
-        """爬取页面内容并提取结构化信息"""
+    def get_cached_page(self, url: str):
+        """查询页面缓存，未过期时返回缓存条目，否则返回None"""
+        entry = self.http_cache.get(url)
+        if entry is not None and time.time() - entry['cached_at'] < HTTP_CACHE_EXPIRE:
+            return entry
+        return None
+
+    def cache_page(self, url: str, headers: httpx.Headers, page: Dict[str, Any]):
+        """响应带ETag或Last-Modified（且未禁止缓存）时保存解析结果"""
+        etag = headers.get('etag', '')
+        last_modified = headers.get('last-modified', '')
+        if (etag or last_modified) and 'no-store' not in headers.get('cache-control', ''):
+            self.http_cache[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'cached_at': time.time(),
+                'page': page
+            }
+
+    async def crawl_page_content(self, url: str) -> Dict[str, Any]:
+        """爬取页面内容并提取结构化信息（有缓存时发条件请求）"""
         try:
-            response = self.session.get(url, timeout=30)
+            cached = self.get_cached_page(url)
+            headers = {}
+            if cached is not None:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            async with self.http_semaphore:
+                response = await self.session.get(url, headers=headers)
+
+            # 页面未修改：没有响应体，直接复用上次的解析结果
+            if response.status_code == 304 and cached is not None:
+                self.not_modified_hits += 1
+                return dict(cached['page'])
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # 直接把原始字节交给解析器（由解析器解码），不再构造response.text副本
+            html = response.content
+            response_headers = response.headers
+            del response
+
+            # HTML解析是CPU密集操作，放到线程中执行，避免阻塞事件循环
+            page = await asyncio.to_thread(self.parse_page_content, url, html)
+            if page.get('status') == 'success':
+                self.cache_page(url, response_headers, page)
+            return page
+
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            return {
+                'url': url,
+                'status': 'failed',
+                'error': str(e),
+                'retryable': not (400 <= status < 500 and status not in RETRYABLE_STATUS_CODES)
+            }
+        except Exception as e:
+            return {
+                'url': url,
+                'status': 'failed',
+                'error': str(e)
+            }
+
+    def parse_page_content(self, url: str, html: bytes) -> Dict[str, Any]:
+        """解析HTML，提取标题、各级标题和正文（优先selectolax，未安装时回退到BeautifulSoup）"""
+        if HTMLParser is not None:
+            return self._parse_with_selectolax(url, html)
 
-            # 提取页面标题
-            title = ''
-            title_tag = soup.find('title')
-            if title_tag:
-                title = title_tag.get_text().strip()
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
 
-            # 提取所有标题
+            # 一次遍历同时提取页面标题（第一个<title>）和所有标题
+            title = None
             headings = []
-            for h1 in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                headings.append({
-                    'level': int(h1.name[1]),
-                    'text': h1.get_text().strip(),
-                    'id': h1.get('id', '')
-                })
+            for tag in soup.find_all(PAGE_TAGS):
+                if tag.name == 'title':
+                    if title is None:
+                        title = tag.get_text().strip()
+                else:
+                    headings.append({
+                        'level': int(tag.name[1]),
+                        'text': tag.get_text().strip(),
+                        'id': tag.get('id', '')
+                    })
+
+            page = {
+                'url': url,
+                'title': title or '',
+                'headings': headings,
+                'status': 'success'
+            }
 
-            # 提取页面主要文本内容
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
+            # 调试时提取页面主要文本内容的预览
+            if CONTENT_PREVIEW_CHARS:
+                for script in soup(["script", "style", "nav", "footer", "header"]):
+                    script.decompose()
+                page['content_preview'] = soup.get_text(separator='\n', strip=True)[:CONTENT_PREVIEW_CHARS]
 
-            main_content = soup.get_text(separator='\n', strip=True)
+            return page
 
+        except Exception as e:
             return {
                 'url': url,
-                'title': title,
+                'status': 'failed',
+                'error': str(e)
+            }
+
+    def _parse_with_selectolax(self, url: str, html: bytes) -> Dict[str, Any]:
+        """selectolax版本的页面解析（返回结构与BeautifulSoup版本一致）"""
+        try:
+            tree = HTMLParser(html)
+
+            # 一次遍历同时提取页面标题（第一个<title>）和所有标题
+            title = None
+            headings = []
+            for node in tree.css(PAGE_TAGS_SELECTOR):
+                if node.tag == 'title':
+                    if title is None:
+                        title = node.text().strip()
+                else:
+                    headings.append({
+                        'level': int(node.tag[1]),
+                        'text': node.text().strip(),
+                        'id': node.attributes.get('id') or ''
+                    })
+
+            page = {
+                'url': url,
+                'title': title or '',
                 'headings': headings,
-                'content': main_content,
                 'status': 'success'
             }
 
+            # 调试时提取页面主要文本内容的预览
+            if CONTENT_PREVIEW_CHARS:
+                tree.strip_tags(["script", "style", "nav", "footer", "header"])
+                main_content = tree.root.text(separator='\n', strip=True) if tree.root else ''
+                page['content_preview'] = main_content[:CONTENT_PREVIEW_CHARS]
+
+            return page
+
         except Exception as e:
             return {
                 'url': url,
@@ -211,12 +521,8 @@ class EnhancedAPICrawler:
                 'error': str(e)
             }
 
-    def identify_target_api_with_gpt(self, url: str, api_from_url: str, page_content: Dict) -> Dict[str, Any]:
-        """使用GPT-4o智能识别目标API"""
-        if not self.use_gpt or page_content.get('status') != 'success':
-            return self._fallback_identification(api_from_url, page_content)
-
-        # 准备提示信息
+    def build_gpt_messages(self, url: str, api_from_url: str, page_content: Dict) -> List[Dict[str, str]]:
+        """构建识别目标API的对话消息（实时调用和Batch API共用）"""
         prompt = f"""你是一个API文档分析专家。请分析以下URL和页面内容，识别出这个URL主要对应的是哪个API。
 
 URL信息:
@@ -225,7 +531,7 @@ URL信息:
 
 页面信息:
 - 标题: {page_content.get('title', '')}
-- 主要标题: {json.dumps(page_content.get('headings', [])[:3], ensure_ascii=False)}
+- 主要标题: {json_dumps(page_content.get('headings', [])[:3])}
 
 分析规则:
 1. 检查页面标题是否明确提到了某个API名称
@@ -254,27 +560,249 @@ URL信息:
 - confidence是0-1之间的置信度分数
 - 如果没有相关信息，字段留空"""
 
+        return [
+            {"role": "system", "content": "你是一个专业的API文档分析专家，擅长从URL和页面内容中识别目标API信息。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def identify_target_api_with_gpt(self, url: str, api_from_url: str, page_content: Dict) -> Dict[str, Any]:
+        """使用GPT-4o智能识别目标API"""
+        if not self.use_gpt or page_content.get('status') != 'success':
+            return self._fallback_identification(api_from_url, page_content)
+
+        cached = self.get_cached_identification(api_from_url, page_content)
+        if cached is not None:
+            return cached
+
+        if GPT_GROUP_SIZE > 1:
+            return await self.enqueue_gpt_identification(url, api_from_url, page_content)
+        return await self.identify_single_with_gpt(url, api_from_url, page_content)
+
+    async def identify_single_with_gpt(self, url: str, api_from_url: str, page_content: Dict) -> Dict[str, Any]:
+        """单个URL调用一次GPT识别"""
         try:
-            messages = [
-                {"role": "system", "content": "你是一个专业的API文档分析专家，擅长从URL和页面内容中识别目标API信息。"},
-                {"role": "user", "content": prompt}
-            ]
-
-            response = self.client.chat.completions.create(
-                model=AZURE_DEPLOYMENT,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=1500
-            )
+            messages = self.build_gpt_messages(url, api_from_url, page_content)
 
-            result = json.loads(response.choices[0].message.content.strip())
+            async with self.gpt_semaphore:
+                response = await self.client.chat.completions.create(
+                    model=AZURE_DEPLOYMENT,
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=1500
+                )
+
+            result = json_loads(response.choices[0].message.content.strip())
             print(f"GPT识别结果: {result.get('target_api', 'N/A')} (置信度: {result.get('confidence', 0):.2f})")
+            self.cache_identification(api_from_url, page_content, result)
             return result
 
         except Exception as e:
             print(f"GPT识别失败: {e}，使用回退方法")
             return self._fallback_identification(api_from_url, page_content)
 
+    async def enqueue_gpt_identification(self, url: str, api_from_url: str, page_content: Dict) -> Dict[str, Any]:
+        """加入合并识别队列，凑满GPT_GROUP_SIZE条或等待GPT_GROUP_FLUSH_SECONDS秒后统一调用"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.gpt_pending.append(((url, api_from_url, page_content), future))
+        if len(self.gpt_pending) >= GPT_GROUP_SIZE:
+            self.flush_gpt_group()
+        elif self.gpt_flush_timer is None:
+            self.gpt_flush_timer = loop.call_later(GPT_GROUP_FLUSH_SECONDS, self.flush_gpt_group)
+        return await future
+
+    def flush_gpt_group(self):
+        """把当前等待的条目作为一组提交识别"""
+        if self.gpt_flush_timer is not None:
+            self.gpt_flush_timer.cancel()
+            self.gpt_flush_timer = None
+        group, self.gpt_pending = self.gpt_pending, []
+        if group:
+            # 保存任务引用，避免任务在完成前被回收
+            task = asyncio.create_task(self._identify_group(group))
+            self.gpt_group_tasks.add(task)
+            task.add_done_callback(self.gpt_group_tasks.discard)
+
+    async def _identify_group(self, group):
+        """识别一组条目，并把结果分发给各自的等待者"""
+        items = [item for item, _ in group]
+        try:
+            if len(items) == 1:
+                results = [await self.identify_single_with_gpt(*items[0])]
+            else:
+                results = await self.identify_batch_with_gpt(items)
+        except Exception as e:
+            print(f"GPT合并识别失败: {e}，使用回退方法")
+            results = [self._fallback_identification(api_from_url, page_content) for _, api_from_url, page_content in items]
+        for (_, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+    def build_group_gpt_messages(self, items: List[tuple]) -> List[Dict[str, str]]:
+        """构建一次识别多个URL的对话消息，要求返回{"results": [...]}，数组元素按编号对应"""
+        entries = []
+        for i, (url, api_from_url, page_content) in enumerate(items, 1):
+            entries.append(f"""{i}. 完整URL: {url}
+   从URL解析的API: {api_from_url}
+   标题: {page_content.get('title', '')}
+   主要标题: {json_dumps(page_content.get('headings', [])[:3])}""")
+        url_list = "\n".join(entries)
+
+        prompt = f"""你是一个API文档分析专家。请分析以下{len(items)}个URL和页面内容，分别识别出每个URL主要对应的是哪个API。
+
+{url_list}
+
+分析规则:
+1. 检查页面标题是否明确提到了某个API名称
+2. 检查主要标题(h1, h2)中是否包含API名称
+3. 考虑URL解析的结果，但以页面实际内容为准
+4. 对于React文档，API名称通常是Hook名称或组件名称
+5. 对于Lodash文档，API名称通常是_开头的函数名
+
+请返回JSON对象，results数组中每个URL一个元素，index为上面的编号:
+{{"results": [
+    {{
+        "index": 1,
+        "target_api": "识别出的主要API名称",
+        "package": "对应的包名（react/lodash等）",
+        "language": "编程语言（JavaScript等）",
+        "deprecated_in": "弃用版本（如果适用）",
+        "removed_in": "移除版本（如果适用）",
+        "replaced_by": "替代API（如果适用）",
+        "change_type": "变更类型",
+        "reason": "变更原因",
+        "source": "来源链接",
+        "confidence": 0.9,
+        "evidence": "判断依据的简要说明"
+    }}
+]}}
+
+注意：
+- 只返回JSON对象，不要包含其他文字
+- target_api应该是具体的API名称
+- confidence是0-1之间的置信度分数
+- 如果没有相关信息，字段留空"""
+
+        return [
+            {"role": "system", "content": "你是一个专业的API文档分析专家，擅长从URL和页面内容中识别目标API信息。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def identify_batch_with_gpt(self, items: List[tuple]) -> List[Dict[str, Any]]:
+        """一次GPT调用识别多个(url, api_from_url, page_content)，按输入顺序返回结果；缺失的条目使用回退方法"""
+        by_index = {}
+        try:
+            messages = self.build_group_gpt_messages(items)
+
+            async with self.gpt_semaphore:
+                response = await self.client.chat.completions.create(
+                    model=AZURE_DEPLOYMENT,
+                    messages=messages,
+                    temperature=0.1,
+                    response_format={"type": "json_object"},
+                    max_tokens=min(GPT_MAX_OUTPUT_TOKENS, GPT_GROUP_TOKENS_PER_URL * len(items))
+                )
+
+            choice = response.choices[0]
+            content = (choice.message.content or "").strip()
+            try:
+                entries = json_loads(content)['results']
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"GPT合并识别响应解析失败（finish_reason={choice.finish_reason}）: {e!r}，响应开头: {content[:200]!r}")
+                entries = []
+            if not isinstance(entries, list):
+                print(f"GPT合并识别响应中的results不是数组: {type(entries).__name__}")
+                entries = []
+            for entry in entries:
+                if isinstance(entry, dict) and 'index' in entry:
+                    by_index[int(entry.pop('index'))] = entry
+        except Exception as e:
+            print(f"GPT合并识别失败: {e}，使用回退方法")
+
+        results = []
+        identified = 0
+        for i, (_, api_from_url, page_content) in enumerate(items, 1):
+            result = by_index.get(i)
+            if result is None:
+                result = self._fallback_identification(api_from_url, page_content)
+            else:
+                identified += 1
+                self.cache_identification(api_from_url, page_content, result)
+            results.append(result)
+        print(f"GPT合并识别结果: {identified}/{len(items)} 条成功")
+        return results
+
+    def prepare_batch_file(self, items: List[Dict[str, Any]], batch_file: str = BATCH_INPUT_FILE) -> str:
+        """把待识别的URL写成Batch API的JSONL输入文件（custom_id使用原始行号，保证唯一）"""
+        with open(batch_file, "w", encoding="utf-8") as f:
+            for item in items:
+                request = {
+                    "custom_id": str(item["original_row_num"]),
+                    "method": "POST",
+                    "url": "/chat/completions",
+                    "body": {
+                        "model": AZURE_DEPLOYMENT,
+                        "messages": self.build_gpt_messages(item["url"], item["api_from_url"], item["page_content"]),
+                        "temperature": 0.1,
+                        "max_tokens": 1500
+                    }
+                }
+                f.write(json_dumps(request) + "\n")
+        return batch_file
+
+    async def identify_batch_with_batch_api(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        通过Azure OpenAI Batch API一次性识别所有URL，返回{custom_id: 识别结果}；失败的条目不在结果中。
+        提交失败或任务未完成时抛出异常
+        """
+        batch_client = AsyncAzureOpenAI(
+            azure_endpoint=AZURE_ENDPOINT,
+            api_key=AZURE_API_KEY,
+            api_version=AZURE_BATCH_API_VERSION
+        )
+        results = {}
+        items_by_id = {str(item["original_row_num"]): item for item in items}
+        try:
+            batch_file = self.prepare_batch_file(items)
+            with open(batch_file, "rb") as f:
+                uploaded = await batch_client.files.create(file=f, purpose="batch")
+            await batch_client.files.wait_for_processing(uploaded.id)
+
+            batch = await batch_client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint="/chat/completions",
+                completion_window="24h"
+            )
+            print(f"📦 已提交Batch任务 {batch.id}（{len(items)} 条请求），每{BATCH_POLL_INTERVAL}秒查询一次状态")
+
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+                batch = await batch_client.batches.retrieve(batch.id)
+                counts = batch.request_counts
+                if counts:
+                    print(f"📦 Batch状态: {batch.status}（完成{counts.completed}/{counts.total}，失败{counts.failed}）")
+
+            if batch.status != "completed" or not batch.output_file_id:
+                raise RuntimeError(f"Batch任务 {batch.id} 未完成: {batch.status}")
+
+            output = await batch_client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json_loads(line)
+                    content = record["response"]["body"]["choices"][0]["message"]["content"]
+                    results[record["custom_id"]] = json_loads(content.strip())
+                    item = items_by_id.get(record["custom_id"])
+                    if item is not None:
+                        self.cache_identification(item["api_from_url"], item["page_content"], results[record["custom_id"]])
+                except Exception as e:
+                    print(f"Batch结果解析失败: {e}")
+            print(f"📦 Batch识别完成：{len(results)}/{len(items)} 条成功")
+        finally:
+            await batch_client.close()
+        return results
+
     def _fallback_identification(self, api_from_url: str, page_content: Dict) -> Dict[str, Any]:
         """回退识别方法（不使用GPT）"""
         title = page_content.get('title', '')
@@ -309,113 +837,147 @@ URL信息:
         if not text:
             return ''
 
-        # 常见的API模式
-        patterns = [
-            r'_([a-zA-Z][\w]*)',  # Lodash模式: _.functionName
-            r'use([A-Z]\w*)',     # React Hook模式: useHookName
-            r'react\.([A-Z]\w*)', # React API模式: React.Component
-            r'\b([A-Z]\w*)\b',    # 组件模式: ComponentName
-        ]
-
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                match = matches[0]
-                if pattern == patterns[0]:  # Lodash
-                    return f"_{match}"
-                elif pattern == patterns[1]:  # React Hook
-                    return f"use{match}"
-                elif pattern == patterns[2]:  # React API
-                    return f"react.{match}"
-                else:
-                    return match
+        # 只需第一个匹配：search代替findall，命中即返回
+        for pattern, prefix in _API_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return f"{prefix}{match.group(1)}"
 
         return ''
 
-    def crawl_single_api(self, url: str, original_row_num: int) -> Dict[str, str]:
-        """单URL爬取函数（增强版，包含智能API识别）"""
-        result = {
+    def new_result(self, url: str, original_row_num: int) -> Dict[str, str]:
+        """创建一条默认失败的结果记录"""
+        return {
             "original_row_num": original_row_num,
             "url": url,
-            "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "crawl_time": crawl_timestamp(),
             "crawl_status": "failed",
             "error_msg": ""
         }
 
-        for retry in range(MAX_RETRIES):
-            try:
-                print(f"正在处理: {url} (尝试 {retry+1}/{MAX_RETRIES})")
-
-                # 第一步：从URL解析API
-                url_info = self.extract_api_from_url(url)
-                api_from_url = url_info.get('api_name', '')
-
-                # 第二步：爬取页面内容
-                page_content = self.crawl_page_content(url)
-                if page_content.get('status') != 'success':
-                    raise ValueError(f"页面爬取失败: {page_content.get('error', 'Unknown error')}")
-
-                # 第三步：使用GPT智能识别API信息
-                api_data = self.identify_target_api_with_gpt(url, api_from_url, page_content)
-
-                # 合并结果到输出格式
-                result.update({
-                    "api": api_data.get('target_api', api_from_url),
-                    "package": api_data.get('package', ''),
-                    "language": api_data.get('language', 'JavaScript'),
-                    "deprecated_in": api_data.get('deprecated_in', ''),
-                    "removed_in": api_data.get('removed_in', ''),
-                    "replaced_by": api_data.get('replaced_by', ''),
-                    "change_type": api_data.get('change_type', ''),
-                    "reason": api_data.get('reason', ''),
-                    "source": api_data.get('source', url),
-                    "crawl_status": "success",
-                    "error_msg": ""
-                })
-
-                print(f"✅ 成功识别API: {result['api']} (置信度: {api_data.get('confidence', 0):.2f})")
-                return result
+    def is_url_only_match(self, url_info: Dict[str, Any]) -> bool:
+        """URL解析结果是否足够可信，可以直接作为最终结果"""
+        return (SKIP_GPT_FOR_URL_MATCH
+                and url_info.get('confidence', 0) >= URL_ONLY_CONFIDENCE
+                and _is_url_only_domain(url_info.get('domain', '')))
 
-            except Exception as e:
-                error_msg = f"第{retry+1}次重试失败：{str(e)}"
-                result["error_msg"] = error_msg
-                if retry < MAX_RETRIES - 1:
-                    time.sleep(RETRY_DELAY)
+    def _result_from_url_only(self, url: str, url_info: Dict[str, Any], original_row_num: int) -> Dict[str, str]:
+        """仅根据URL解析结果生成输出（不爬取页面、不调用GPT），包名按域名判断"""
+        domain = url_info.get('domain') or urlsplit(url).netloc.lower()
+        package = ''
+        if 'react' in domain:
+            package = 'react'
+        elif 'lodash' in domain:
+            package = 'lodash'
+
+        result = self.new_result(url, original_row_num)
+        api_data = {
+            'target_api': url_info.get('api_name', ''),
+            'package': package,
+            'language': 'JavaScript',
+            'source': url,
+            'confidence': url_info.get('confidence', 0)
+        }
+        return self.merge_api_data(result, url, url_info.get('api_name', ''), api_data)
 
-        # 所有重试失败，返回失败结果
+    async def fetch_page_with_retry(self, url: str, api_from_url: str, result: Dict[str, str]):
+        """爬取页面（失败重试），返回page_content；全部失败时返回None（result中记录错误信息）"""
+        for retry in range(MAX_RETRIES):
+            print(f"正在处理: {url} (尝试 {retry+1}/{MAX_RETRIES})")
+
+            # 第二步：爬取页面内容
+            page_content = await self.crawl_page_content(url)
+            if page_content.get('status') == 'success':
+                return page_content
+
+            result["error_msg"] = f"第{retry+1}次重试失败：页面爬取失败: {page_content.get('error', 'Unknown error')}"
+            # 确定性的客户端错误（如404/410）不再重试
+            if not page_content.get('retryable', True):
+                result["error_msg"] = f"页面爬取失败（不可重试）: {page_content.get('error', 'Unknown error')}"
+                result["api"] = api_from_url
+                return None
+            if retry < MAX_RETRIES - 1:
+                await asyncio.sleep(RETRY_DELAY)
+
+        # 所有重试失败
         result["error_msg"] = f"超过{MAX_RETRIES}次重试：{result['error_msg']}"
-        result["api"] = url_info.get('api_name', 'unknown')
+        result["api"] = api_from_url
+        return None
+
+    def merge_api_data(self, result: Dict[str, str], url: str, api_from_url: str, api_data: Dict[str, Any]) -> Dict[str, str]:
+        """把识别出的API信息合并到输出格式"""
+        result.update({
+            "api": api_data.get('target_api', api_from_url),
+            "package": api_data.get('package', ''),
+            "language": api_data.get('language', 'JavaScript'),
+            "deprecated_in": api_data.get('deprecated_in', ''),
+            "removed_in": api_data.get('removed_in', ''),
+            "replaced_by": api_data.get('replaced_by', ''),
+            "change_type": api_data.get('change_type', ''),
+            "reason": api_data.get('reason', ''),
+            "source": api_data.get('source', url),
+            "crawl_status": "success",
+            "error_msg": ""
+        })
+        print(f"✅ 成功识别API: {result['api']} (置信度: {api_data.get('confidence', 0):.2f})")
         return result
 
+    async def crawl_single_api(self, url: str, original_row_num: int) -> Dict[str, str]:
+        """单URL爬取函数（增强版，包含智能API识别）"""
+        # 第一步：从URL解析API（高置信度时直接返回，省去页面爬取和GPT调用）
+        url_info = self.extract_api_from_url(url)
+        if self.is_url_only_match(url_info):
+            return self._result_from_url_only(url, url_info, original_row_num)
+        api_from_url = url_info.get('api_name', '')
+
+        result = self.new_result(url, original_row_num)
+        page_content = await self.fetch_page_with_retry(url, api_from_url, result)
+        if page_content is None:
+            return result
+
+        # 第三步：使用GPT智能识别API信息
+        api_data = await self.identify_target_api_with_gpt(url, api_from_url, page_content)
+        return self.merge_api_data(result, url, api_from_url, api_data)
+
 
 # -------------------------- 基础工具函数 --------------------------
+def parse_args():
+    """命令行参数（未指定时使用上面的默认配置）"""
+    parser = argparse.ArgumentParser(description="增强版API爬虫（智能API识别）")
+    parser.add_argument("--input", default=INPUT_CSV, help="URL输入CSV")
+    parser.add_argument("--output", default=OUTPUT_CSV, help="最终结果CSV")
+    parser.add_argument("--temp", default=TEMP_CSV, help="断点续爬临时CSV")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="同时进行的URL任务数")
+    parser.add_argument("--http-concurrency", type=int, default=HTTP_CONCURRENCY, help="同时进行的页面请求数")
+    parser.add_argument("--gpt-concurrency", type=int, default=GPT_CONCURRENCY, help="同时进行的GPT调用数")
+    parser.add_argument("--batch-api", action="store_true", default=USE_BATCH_API,
+                        help=f"待识别URL不少于{BATCH_API_MIN_URLS}条时使用Azure Batch API（需要Global-Batch部署，最长等待24小时）")
+    return parser.parse_args()
+
+
 def load_urls_from_csv(csv_file, temp_file=TEMP_CSV):
-    """加载URL列表，支持断点续爬"""
+    """加载URL列表，支持断点续爬（pandas按列读取和过滤，避免逐行构造dict）"""
+    # 所有列按字符串读取，空单元格保持为空字符串
+    read_options = {"dtype": str, "keep_default_na": False, "encoding": "utf-8"}
+
     completed_urls = set()
     if os.path.exists(temp_file):
-        with open(temp_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            if "url" in reader.fieldnames and "crawl_status" in reader.fieldnames:
-                for row in reader:
-                    if row["crawl_status"] == "success":
-                        completed_urls.add(row["url"].strip())
+        completed = pd.read_csv(temp_file, usecols=lambda col: col in ("url", "crawl_status"), **read_options)
+        if "url" in completed.columns and "crawl_status" in completed.columns:
+            completed_urls = set(completed.loc[completed["crawl_status"] == "success", "url"].str.strip())
         print(f"🔍 发现临时文件，已爬取成功 {len(completed_urls)} 条URL，将跳过这些URL")
 
     # 读取输入CSV的所有URL，过滤已完成的
-    all_urls = []
     try:
-        with open(csv_file, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            if "url" not in reader.fieldnames:
-                raise ValueError("输入CSV必须包含'url'表头")
-
-            for row_num, row in enumerate(reader, 2):
-                url = row["url"].strip()
-                if url and url not in completed_urls:
-                    all_urls.append({
-                        "url": url,
-                        "original_row_num": row_num
-                    })
+        df = pd.read_csv(csv_file, usecols=lambda col: col == "url", **read_options)
+        if "url" not in df.columns:
+            raise ValueError("输入CSV必须包含'url'表头")
+
+        # 原始行号在过滤前计算（行号从2开始，表头为1）
+        df["original_row_num"] = range(2, len(df) + 2)
+        df["url"] = df["url"].str.strip()
+        df = df[(df["url"] != "") & ~df["url"].isin(completed_urls)]
+        all_urls = df.to_dict("records")
 
         total_input = len(all_urls) + len(completed_urls)
         print(f"✅ 从输入CSV加载完成：总计 {total_input} 条URL，待爬取 {len(all_urls)} 条，已完成 {len(completed_urls)} 条")
@@ -433,38 +995,165 @@ def init_temp_csv(temp_file=TEMP_CSV):
     """初始化临时CSV文件"""
     if not os.path.exists(temp_file):
         with open(temp_file, "w", newline="", encoding="utf-8") as f:
-            csv_columns = get_csv_columns()
-            writer = csv.DictWriter(f, fieldnames=csv_columns, restval="")
+            writer = csv.DictWriter(f, fieldnames=get_csv_columns(), restval="")
             writer.writeheader()
     return temp_file
 
 
+# CSV输出字段（与api_crawler.py保持一致；模块级元组，只构建一次）
+_CSV_COLUMNS = (
+    # 基础定位信息
+    "original_row_num", "url", "crawl_time", "crawl_status", "error_msg",
+    # API核心信息
+    "api", "package", "language",
+    # API变更信息
+    "deprecated_in", "removed_in", "replaced_by", "change_type", "reason",
+    # 来源信息
+    "source"
+)
+
+
 def get_csv_columns():
     """定义CSV输出字段（与api_crawler.py保持一致）"""
-    return [
-        # 基础定位信息
-        "original_row_num", "url", "crawl_time", "crawl_status", "error_msg",
-        # API核心信息
-        "api", "package", "language",
-        # API变更信息
-        "deprecated_in", "removed_in", "replaced_by", "change_type", "reason",
-        # 来源信息
-        "source"
-    ]
-
-
-def write_result_to_csv(result, csv_file, lock):
-    """线程安全的CSV写入函数"""
-    with lock:
-        with open(csv_file, "a", newline="", encoding="utf-8") as f:
-            csv_columns = get_csv_columns()
-            writer = csv.DictWriter(f, fieldnames=csv_columns, restval="")
-            # 过滤掉不在字段列表中的键
-            filtered_result = {k: result.get(k, "") for k in csv_columns}
-            writer.writerow(filtered_result)
+    return _CSV_COLUMNS
+
+
+async def csv_writer_task(result_queue, csv_file):
+    """唯一的CSV写入任务：文件只打开一次，从队列批量取出结果写入，收到None时结束"""
+    with open(csv_file, "a", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        # extrasaction="ignore"过滤掉不在字段列表中的键，restval补齐缺失字段
+        writer = csv.DictWriter(f, fieldnames=get_csv_columns(), restval="", extrasaction="ignore")
+        done = False
+        unflushed = 0
+        while not done:
+            batch = [await result_queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE and not result_queue.empty():
+                batch.append(result_queue.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            writer.writerows(batch)
+            unflushed += len(batch)
+            if unflushed >= FLUSH_EVERY_ROWS:
+                f.flush()
+                unflushed = 0
+        # 退出with时关闭文件，写出缓冲区中剩余的行
 
 
 # -------------------------- 批量爬取主逻辑 --------------------------
+async def crawl_all(all_urls, temp_csv, start_time):
+    """在一个事件循环中并发爬取所有URL（信号量限制并发数），完成一条写入一条"""
+    total_to_crawl = len(all_urls)
+    stats = {"completed": 0, "success": 0, "fail": 0}
+
+    # 爬虫实例在事件循环内创建，保证HTTP/GPT客户端绑定到当前循环
+    crawler = EnhancedAPICrawler()
+    semaphore = asyncio.Semaphore(min(MAX_WORKERS, total_to_crawl))
+    use_batch_api = crawler.use_gpt and USE_BATCH_API and total_to_crawl >= BATCH_API_MIN_URLS
+
+    result_queue = asyncio.Queue(maxsize=RESULT_QUEUE_SIZE)
+    writer = asyncio.create_task(csv_writer_task(result_queue, temp_csv))
+
+    async def record(result):
+        """结果交给写入任务，并更新进度"""
+        url = result["url"]
+        stats["completed"] += 1
+        completed_count = stats["completed"]
+        await result_queue.put(result)
+
+        if result["crawl_status"] == "success":
+            stats["success"] += 1
+            print(f"✅ [{completed_count}/{total_to_crawl}] 成功：{url} → {result.get('api', 'N/A')}")
+        else:
+            stats["fail"] += 1
+            print(f"❌ [{completed_count}/{total_to_crawl}] 失败：{url}（{result['error_msg'][:50]}...）")
+
+        # 批量进度汇总
+        if completed_count % BATCH_SIZE == 0 or completed_count == total_to_crawl:
+            elapsed_time = (datetime.now() - start_time).total_seconds()
+            avg_time_per_url = elapsed_time / completed_count if completed_count > 0 else 0
+            remaining_time = avg_time_per_url * (total_to_crawl - completed_count)
+            print(f"\n 进度汇总：已完成{completed_count}/{total_to_crawl}（成功{stats['success']}，失败{stats['fail']}）")
+            print(f"⏱  已耗时：{elapsed_time:.1f}秒，预计剩余：{remaining_time:.1f}秒\n")
+
+    def error_result(url_info, e):
+        result = crawler.new_result(url_info["url"], url_info["original_row_num"])
+        result["error_msg"] = f"任务执行异常：{str(e)}"
+        return result
+
+    async def crawl_job(url_info):
+        """单个任务：未捕获的异常转换为失败结果"""
+        async with semaphore:
+            try:
+                return await crawler.crawl_single_api(url_info["url"], url_info["original_row_num"])
+            except Exception as e:
+                return error_result(url_info, e)
+
+    async def fetch_job(url_info):
+        """Batch模式第一阶段：只爬取页面，返回(result, 待识别条目或None)"""
+        async with semaphore:
+            try:
+                api_info = crawler.extract_api_from_url(url_info["url"])
+                if crawler.is_url_only_match(api_info):
+                    return crawler._result_from_url_only(url_info["url"], api_info, url_info["original_row_num"]), None
+                api_from_url = api_info.get('api_name', '')
+
+                result = crawler.new_result(url_info["url"], url_info["original_row_num"])
+                page_content = await crawler.fetch_page_with_retry(url_info["url"], api_from_url, result)
+                if page_content is None:
+                    return result, None
+                return result, {**url_info, "api_from_url": api_from_url, "page_content": page_content}
+            except Exception as e:
+                return error_result(url_info, e), None
+
+    try:
+        if not use_batch_api:
+            # 实时处理完成的任务
+            for job in asyncio.as_completed([crawl_job(url_info) for url_info in all_urls]):
+                await record(await job)
+        else:
+            # 第一阶段：并发爬取所有页面，爬取失败的直接写入
+            pending = []
+            for job in asyncio.as_completed([fetch_job(url_info) for url_info in all_urls]):
+                result, item = await job
+                if item is None:
+                    await record(result)
+                else:
+                    pending.append((result, item))
+
+            # 第二阶段：缓存未命中的页面通过一次Batch任务识别；没有识别结果的条目记为失败（重新运行时会再次处理）
+            api_results = {}
+            to_identify = []
+            for _, item in pending:
+                cached = crawler.get_cached_identification(item["api_from_url"], item["page_content"])
+                if cached is not None:
+                    api_results[str(item["original_row_num"])] = cached
+                else:
+                    to_identify.append(item)
+            batch_error = ""
+            if to_identify:
+                try:
+                    api_results.update(await crawler.identify_batch_with_batch_api(to_identify))
+                except Exception as e:
+                    batch_error = f"Batch API提交失败：{str(e)}"
+                    print(f"❌ {batch_error}（{len(to_identify)} 条URL记为失败；请确认部署为Global-Batch类型，或去掉--batch-api使用实时调用）")
+            for result, item in pending:
+                api_data = api_results.get(str(item["original_row_num"]))
+                if api_data is None:
+                    result["error_msg"] = batch_error or "Batch结果中缺少该URL的识别结果"
+                    result["api"] = item["api_from_url"]
+                    await record(result)
+                    continue
+                await record(crawler.merge_api_data(result, item["url"], item["api_from_url"], api_data))
+    finally:
+        # 通知写入任务结束，等待剩余结果写盘
+        await result_queue.put(None)
+        await writer
+        await crawler.aclose()
+
+    return stats["success"], stats["fail"], crawler.use_gpt
+
+
 def batch_crawl_large_scale(input_csv, output_csv, temp_csv):
     # 1. 初始化
     all_urls = load_urls_from_csv(input_csv, temp_csv)
@@ -478,62 +1167,17 @@ def batch_crawl_large_scale(input_csv, output_csv, temp_csv):
 
     # 2. 初始化进度统计
     total_to_crawl = len(all_urls)
-    completed_count = 0
-    success_count = 0
-    fail_count = 0
     start_time = datetime.now()
 
     print(f"\n🚀 开始批量爬取：{start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"📊 配置：线程数={MAX_WORKERS}，重试次数={MAX_RETRIES}")
+    print(f"📊 配置：并发任务数={MAX_WORKERS}（页面请求{HTTP_CONCURRENCY}，GPT调用{GPT_CONCURRENCY}），重试次数={MAX_RETRIES}")
     print(f"🤖 智能API识别：{'启用' if AZURE_API_KEY else '禁用'}")
-    print(f"⏳ 预计耗时：{total_to_crawl / MAX_WORKERS * 2:.1f} 秒（估算）\n")
+    if USE_BATCH_API and total_to_crawl >= BATCH_API_MIN_URLS:
+        print(f"📦 GPT识别模式：Batch API（先爬取全部页面，再一次性提交识别）")
+    print(f"⏳ 预计耗时：{total_to_crawl / min(MAX_WORKERS, GPT_CONCURRENCY) * 2:.1f} 秒（估算）\n")
 
-    # 3. 创建爬虫实例
-    crawler = EnhancedAPICrawler()
-
-    # 4. 多线程批量爬取
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_tasks = {
-            executor.submit(crawler.crawl_single_api, url_info["url"], url_info["original_row_num"]):
-            url_info for url_info in all_urls
-        }
-
-        # 实时处理完成的任务
-        for future in as_completed(future_tasks):
-            url_info = future_tasks[future]
-            url = url_info["url"]
-            completed_count += 1
-
-            try:
-                result = future.result(timeout=60)
-                write_result_to_csv(result, temp_csv, csv_lock)
-
-                if result["crawl_status"] == "success":
-                    success_count += 1
-                    print(f"✅ [{completed_count}/{total_to_crawl}] 成功：{url} → {result.get('api', 'N/A')}")
-                else:
-                    fail_count += 1
-                    print(f"❌ [{completed_count}/{total_to_crawl}] 失败：{url}（{result['error_msg'][:50]}...）")
-
-                # 批量进度汇总
-                if completed_count % BATCH_SIZE == 0 or completed_count == total_to_crawl:
-                    elapsed_time = (datetime.now() - start_time).total_seconds()
-                    avg_time_per_url = elapsed_time / completed_count if completed_count > 0 else 0
-                    remaining_time = avg_time_per_url * (total_to_crawl - completed_count)
-                    print(f"\n 进度汇总：已完成{completed_count}/{total_to_crawl}（成功{success_count}，失败{fail_count}）")
-                    print(f"⏱  已耗时：{elapsed_time:.1f}秒，预计剩余：{remaining_time:.1f}秒\n")
-
-            except Exception as e:
-                fail_count += 1
-                error_result = {
-                    "original_row_num": url_info["original_row_num"],
-                    "url": url,
-                    "crawl_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "crawl_status": "failed",
-                    "error_msg": f"线程执行异常：{str(e)}"
-                }
-                write_result_to_csv(error_result, temp_csv, csv_lock)
-                print(f"❌ [{completed_count}/{total_to_crawl}] 异常：{url}（{str(e)[:50]}...）")
+    # 3. asyncio并发爬取（单线程事件循环，替代线程池）
+    success_count, fail_count, use_gpt = asyncio.run(crawl_all(all_urls, temp_csv, start_time))
 
     # 5. 完成：生成最终报告
     end_time = datetime.now()
@@ -557,8 +1201,8 @@ def batch_crawl_large_scale(input_csv, output_csv, temp_csv):
     print(f"   - 失败数：{fail_count}")
     print(f"   - 成功率：{success_count / total_to_crawl * 100:.1f}%" if total_to_crawl > 0 else "0%")
     print(f"⏱  耗时：{total_elapsed // 60:.0f}分{total_elapsed % 60:.1f}秒")
-    print(f" 智能识别：{'GPT-4o增强' if crawler.use_gpt else '基础解析'}")
-    print(f" 结果文件：{os.path.abspath(output_file)}")
+    print(f" 智能识别：{'GPT-4o增强' if use_gpt else '基础解析'}")
+    print(f" 结果文件：{os.path.abspath(output_csv)}")
     print("=" * 60)
 
 
@@ -568,18 +1212,22 @@ if __name__ == "__main__":
     current_dir = os.path.dirname(os.path.abspath(__file__))
     sys.path.append(current_dir)
 
-    # 添加必要的导入
-    import re
-
-    # 2. 检查依赖文件
-    if not os.path.exists(INPUT_CSV):
-        print(f"❌ 输入CSV文件不存在：{INPUT_CSV}")
-        print("💡 提示：请修改INPUT_CSV变量为正确的文件路径")
+    # 2. 读取命令行参数（覆盖默认配置）
+    args = parse_args()
+    MAX_WORKERS = args.workers
+    HTTP_CONCURRENCY = args.http_concurrency
+    GPT_CONCURRENCY = args.gpt_concurrency
+    USE_BATCH_API = args.batch_api
+
+    # 3. 检查依赖文件
+    if not os.path.exists(args.input):
+        print(f"❌ 输入CSV文件不存在：{args.input}")
+        print("💡 提示：请通过--input参数或INPUT_CSV变量指定正确的文件路径")
         sys.exit(1)
 
-    # 3. 启动增强版批量爬取
+    # 4. 启动增强版批量爬取
     batch_crawl_large_scale(
-        input_csv=INPUT_CSV,
-        output_csv=OUTPUT_CSV,
-        temp_csv=TEMP_CSV
+        input_csv=args.input,
+        output_csv=args.output,
+        temp_csv=args.temp
     )
\ No newline at end of file
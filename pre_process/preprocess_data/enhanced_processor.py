@@ -9,11 +9,467 @@ import re
 import csv
 import json
 import time
-import requests
+import shelve
+import asyncio
+import hashlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import httpx
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from typing import List, Dict, Any, Optional
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI
+try:
+    # C实现的HTML解析器（lexbor），比BeautifulSoup快一个数量级
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    # 安装lxml后BeautifulSoup使用C实现的解析器，比html.parser快数倍
+    import lxml  # noqa: F401
+    BS_PARSER = 'lxml'
+except ImportError:
+    BS_PARSER = 'html.parser'
+try:
+    # orjson（Rust实现）的序列化/反序列化比标准库json快数倍，未安装时回退到json
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj, indent: bool = False) -> str:
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False），indent为True时2空格缩进"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+
+    def write_json_file(obj, path: str):
+        """以2空格缩进写入JSON文件（输出UTF-8原文，直接写bytes）"""
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj, indent: bool = False) -> str:
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False），indent为True时2空格缩进"""
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+    def write_json_file(obj, path: str):
+        """以2空格缩进写入JSON文件（输出UTF-8原文）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+try:
+    # xxhash（xxh3）计算页面内容指纹比加密哈希快得多，未安装时回退到blake2b
+    import xxhash
+
+    def html_digest(html_content: str) -> str:
+        """页面HTML的内容指纹（用于识别不同URL返回的相同页面）"""
+        return xxhash.xxh3_64_hexdigest(html_content)
+except ImportError:
+    def html_digest(html_content: str) -> str:
+        """页面HTML的内容指纹（用于识别不同URL返回的相同页面）"""
+        return hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).hexdigest()
+try:
+    # 安装brotli后可以接受br压缩（httpx自动解码）
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+try:
+    # 安装httpx[http2]（h2包）后启用HTTP/2，同一文档站点的并发请求复用一条连接
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+# 并发配置（页面爬取是网络I/O，可以开得较宽；GPT调用单独限流，429由客户端自动重试）
+HTTP_CONCURRENCY = 20  # 同时进行的页面请求数
+GPT_CONCURRENCY = 8    # 同时进行的GPT调用数
+PARSE_WORKERS = os.cpu_count() or 1  # HTML解析进程数（解析受GIL限制，用进程池利用多核）
+# HTTP连接池与重试配置
+HTTP_KEEPALIVE_CONNECTIONS = 32             # 空闲时保留的keep-alive连接数
+HTTP_CONNECT_RETRIES = 2                    # 建立连接失败时由传输层直接重试
+HTTP_MAX_RETRIES = 3                        # 临时错误状态码的最大重试次数
+HTTP_RETRY_BACKOFF = 0.3                    # 重试退避基数（秒），第n次重试等待 backoff * 2**n
+HTTP_RETRY_STATUS = (429, 500, 502, 503, 504)  # 需要重试的状态码
+
+# GPT调用配置：JSON模式（response_format需要2024-08-01-preview及以上版本）下模型只输出JSON，
+# 生成token数决定响应时间，上限按实际需要的JSON长度设置
+AZURE_API_VERSION = "2024-08-01-preview"
+GPT_FILTER_MAX_TOKENS = 600    # 相关性判断只返回block_index列表
+GPT_EXTRACT_MAX_TOKENS = 1500  # 分离后的示例代码与输出
+
+# 磁盘缓存配置（shelve），重跑时未变化的页面和提示词不再重复请求
+GPT_CACHE_FILE = ".processor_gpt_cache"    # GPT响应缓存：提示词哈希 -> 响应内容
+GPT_CACHE_TTL = 7 * 86400                  # GPT响应缓存有效期（秒）
+HTTP_CACHE_FILE = ".processor_http_cache"  # 页面缓存：URL -> HTML及ETag/Last-Modified
+HTTP_CACHE_EXPIRE = 86400                  # 页面缓存有效期（秒），过期后重新完整下载
+ANALYSIS_CACHE_SIZE = 1024                 # 内存中保留的(页面内容指纹, 目标API)分析结果数（LRU）
+FAILED_METHODS = ('Crawl Failed', 'Processing Failed')  # 这些extraction_method的结果在断点续跑时重新处理
+
+# 预编译的正则（与API无关的模式在模块级只编译一次）
+# 手动分离示例时的行分类：新示例开始（>>>、//或标识符开头，且含赋值/_./function/=>，或为>>> console），
+# 以及示例的输入代码（>>>、...、//或标识符开头）；匹配对象是strip后的单行
+_EXAMPLE_START_RE = re.compile(r'(?=>>>|//|\w)(?:.*(?:=|_\.|function)|>>> console)')
+_EXAMPLE_CODE_RE = re.compile(r'>>>|\.\.\.|//|\w')
+# 同一行中出现import/require且出现lodash或_（Lodash引用语句）
+_LODASH_IMPORT_RE = re.compile(r'^(?=[^\n]*(?:import|require))[^\n]*(?:lodash|_)', re.M)
+
+# 代码块描述的候选标签，以及每个代码块最多检查的前置候选数
+DESCRIPTION_TAGS = ['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+DESCRIPTION_LOOKBACK = 5
+DESCRIPTION_SELECTOR = ', '.join(DESCRIPTION_TAGS + ['pre'])
+
+# 相关性判断的提示词里每个代码块只发送开头部分（完整代码保留在本地，只回传block_index）
+PROMPT_CODE_CHARS = 300         # 每个代码块发送的代码字符数
+PROMPT_DESCRIPTION_CHARS = 150  # 每个代码块发送的描述字符数
+# 关键词匹配到的代码块不超过该数量且全部是_.api(调用时，直接采用结果，跳过GPT相关性判断
+KEYWORD_FAST_PATH_MAX_BLOCKS = 3
+
+# GPT提示词模板：规则说明对所有source完全相同，页面URL、目标API和代码放在末尾（%s替换），
+# 使请求的长前缀保持一致，可以命中Azure OpenAI的自动提示词前缀缓存
+FILTER_SYSTEM_PROMPT = "你是一个专业的Lodash文档分析专家，擅长识别代码示例与特定API的关联性。"
+FILTER_PROMPT_TEMPLATE = f"""你是一个文档分析专家。请分析文档页面的代码块，识别哪些代码示例是专门用来演示目标API的。页面URL、目标API和所有代码块在最后给出。
+
+代码块格式为 "[block_index] hits_api=代码中是否出现目标API名 len=代码总长度"，随后是代码的前{PROMPT_CODE_CHARS}个字符。
+
+请按以下规则分析：
+1. 识别直接使用目标API函数的代码示例
+2. 识别演示目标API核心功能的示例
+3. 排除只使用其他Lodash函数的示例
+4. 排除与目标API无关的通用示例
+5. 如果示例中同时包含多个API，但主要演示的是目标API，则包含它
+6. 注意代码描述中的提示，描述通常会说明这个示例演示的是哪个API
+
+请返回JSON格式，只包含与目标API相关的代码示例：
+{{
+    "relevant_examples": [
+        {{
+            "block_index": 0,
+            "is_relevant": true,
+            "reason": "这个示例直接使用了目标API函数",
+            "confidence": 0.9
+        }},
+        {{
+            "block_index": 1,
+            "is_relevant": false,
+            "reason": "这个示例使用的是其他API",
+            "confidence": 0.1
+        }}
+    ]
+}}
+
+注意：
+- block_index 对应代码块在页面中的顺序（从0开始）
+- confidence 是0-1之间的置信度分数
+- 只返回is_relevant为true的示例的block_index列表
+
+页面URL: %s
+目标API: "%s"
+
+所有代码块:
+%s"""
+EXTRACT_SYSTEM_PROMPT = "你是一个专业的JavaScript代码分析专家，擅长识别和分离Lodash API的代码示例。"
+EXTRACT_PROMPT_TEMPLATE = """你是一个JavaScript代码分析专家。请分析Lodash代码示例，专注于目标API，将其分离为独立的代码示例，每个示例包含输入代码和对应的输出。目标API和混合的代码在最后给出。
+
+规则：
+1. 只分析与目标API相关的代码示例
+2. 识别独立的代码示例块（通常包含Lodash函数调用）
+3. 每个示例应该包含完整的输入代码和对应的输出
+4. 保持代码的原始格式和缩进
+5. 错误信息也属于输出
+6. 如果有多个相关的代码行，将它们组合为一个示例
+7. **重要**：不要提取只有import/require语句的示例
+8. 确保每个示例都包含目标API的使用
+
+请以JSON格式返回提取的结果：
+{
+    "examples": [
+        {
+            "code": "输入代码1，包含必要的require/import语句",
+            "output": "对应的输出1"
+        },
+        {
+            "code": "输入代码2，包含必要的require/import语句",
+            "output": "对应的输出2"
+        }
+    ]
+}
+
+注意：
+- 每个code字段都应该包含完整的可执行代码，包括必要的require/import语句
+- 保持代码的原始缩进和格式
+- 不要添加任何额外的解释文字
+- 如果没有输出，output字段设为空字符串
+- **重要**：跳过只有require/import语句而没有实际操作的示例
+- **重要**：确保每个示例都演示了目标API的用法
+
+目标API: "%s"
+
+混合的代码：
+```
+%s
+```"""
+
+
+@lru_cache(maxsize=1024)
+def _keyword_patterns(clean_api: str):
+    """关键词匹配用的API模式（忽略大小写），按API名称缓存编译结果；API名称按字面匹配（转义$、*等字符）"""
+    api = re.escape(clean_api)
+    return tuple(re.compile(pattern, re.IGNORECASE) for pattern in [
+        rf'_\.{api}',
+        rf'lodash\.{api}',
+        rf'\.{api}\(',
+        rf'{api}\(',
+        rf'["\'`]{api}["\'`]'  # 字符串中提到API名
+    ])
+
+
+@lru_cache(maxsize=1024)
+def _strict_call_pattern(clean_api: str):
+    """严格的Lodash调用模式（_.api(），用于判断关键词匹配是否无歧义"""
+    return re.compile(rf'_\.{re.escape(clean_api)}\(')
+
+
+@lru_cache(maxsize=1024)
+def _actual_code_pattern(target_api: str):
+    """手动分离示例时判断"含实际代码且使用目标API"的整段模式（多行模式，每次匹配限定在一行内）：
+    >>> 后不是import/require、... 后非空，或不以//开头且含实际操作的代码行，同时该部分出现目标API"""
+    api = re.escape(target_api)
+    hit = rf'(?:\.{api}[^\S\n]*\(|{api})'
+    return re.compile(
+        rf'^[^\S\n]*(?:'
+        rf'>>>[^\S\n]*(?=\S)(?!import|require)(?=[^\n]*?{hit})'
+        rf'|\.\.\.[^\S\n]*(?=\S)(?=[^\n]*?{hit})'
+        rf'|(?!>>>|\.\.\.|//)(?=\S)(?=[^\n]*?(?:_\.|function|\w+[^\S\n]*=|console\.|return))(?=[^\n]*?{hit})'
+        rf')',
+        re.M
+    )
+
+
+# -------------------------- 页面解析（纯函数，可在进程池中执行） --------------------------
+def extract_code_blocks(html_content: str) -> List[Dict[str, Any]]:
+    """提取页面中所有的代码块，不进行过滤（优先selectolax，未安装时回退到BeautifulSoup）"""
+    if HTMLParser is not None:
+        return _extract_code_blocks_selectolax(html_content)
+
+    soup = BeautifulSoup(html_content, BS_PARSER)
+    code_blocks = []
+
+    # 按文档顺序一次遍历pre标签和描述候选标签，记录最近的几个候选，
+    # 代替每个pre标签各自向前回溯整棵树的find_all_previous
+    recent = deque(maxlen=DESCRIPTION_LOOKBACK)
+    i = -1
+    for tag in soup.find_all(DESCRIPTION_TAGS + ['pre']):
+        if tag.name != 'pre':
+            recent.append(tag)
+            continue
+
+        i += 1
+        code_text = tag.get_text().strip()
+        if not code_text:
+            continue
+
+        # 查找代码块之前的描述文本（从最近的候选开始）
+        description = ""
+        for prev in reversed(recent):
+            text = prev.get_text().strip()
+            if text and len(text) > 10 and not text.startswith('Example') and not text.startswith('Code'):
+                description = text
+                break
+
+        code_blocks.append({
+            'index': i,
+            'code': code_text,
+            'description': description
+        })
+
+    return code_blocks
+
+
+def _extract_code_blocks_selectolax(html_content: str) -> List[Dict[str, Any]]:
+    """selectolax版本的代码块提取（返回结构与BeautifulSoup版本一致）"""
+    tree = HTMLParser(html_content)
+    code_blocks = []
+
+    # 与BeautifulSoup版本相同：按文档顺序一次遍历，记录最近的几个描述候选
+    recent = deque(maxlen=DESCRIPTION_LOOKBACK)
+    i = -1
+    for node in tree.css(DESCRIPTION_SELECTOR):
+        if node.tag != 'pre':
+            recent.append(node)
+            continue
+
+        i += 1
+        code_text = node.text().strip()
+        if not code_text:
+            continue
+
+        # 查找代码块之前的描述文本（从最近的候选开始）
+        description = ""
+        for prev in reversed(recent):
+            text = prev.text().strip()
+            if text and len(text) > 10 and not text.startswith('Example') and not text.startswith('Code'):
+                description = text
+                break
+
+        code_blocks.append({
+            'index': i,
+            'code': code_text,
+            'description': description
+        })
+
+    return code_blocks
+
+
+def filter_code_blocks_by_keywords(code_blocks: List[Dict], target_api: str) -> List[Dict[str, Any]]:
+    """使用关键词匹配过滤示例（GPT失败时的回退方案）"""
+    relevant_blocks = []
+
+    # 清理API名称，移除可能的别名前缀
+    clean_api = target_api.replace('_.', '').strip()
+    clean_api_lower = clean_api.lower()
+    api_patterns = _keyword_patterns(clean_api)
+
+    for block in code_blocks:
+        code = block['code']
+        description = block['description']
+
+        # 检查代码中是否包含目标API
+        found_api = any(pattern.search(code) for pattern in api_patterns)
+
+        # 检查描述中是否提到API
+        description_mention = clean_api_lower in description.lower() if description else False
+
+        if found_api or description_mention:
+            relevant_blocks.append({
+                **block,
+                'keyword_confidence': 0.7 if found_api else 0.5,
+                'keyword_reason': f"关键词匹配: {clean_api}"
+            })
+
+    print(f"关键词匹配识别出 {len(relevant_blocks)} 个与 {target_api} 相关的示例")
+    return relevant_blocks
+
+
+def canonical_url(url: str) -> str:
+    """去掉URL的#锚点（锚点不发送给服务器，只差锚点的URL是同一个页面）"""
+    return urlparse(url)._replace(fragment='').geturl()
+
+
+def create_session() -> httpx.AsyncClient:
+    """创建异步HTTP会话（所有页面请求共享连接池）"""
+    return httpx.AsyncClient(
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept-Encoding': ACCEPT_ENCODING
+        },
+        timeout=30,
+        # 自定义transport时，连接池上限和http2必须设置在transport上
+        transport=httpx.AsyncHTTPTransport(
+            retries=HTTP_CONNECT_RETRIES,
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(
+                max_connections=HTTP_CONCURRENCY,
+                max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS
+            ),
+        ),
+        follow_redirects=True  # 与requests默认行为一致
+    )
+
+
+# 模块级共享的HTTP会话：同一事件循环中的所有处理器实例复用一个连接池（连接绑定事件循环，换循环时重建）
+_SHARED_SESSION: Optional[httpx.AsyncClient] = None
+_SHARED_SESSION_LOOP = None
+
+
+def get_shared_session() -> httpx.AsyncClient:
+    """返回当前事件循环的共享HTTP会话，不存在或已关闭时创建"""
+    global _SHARED_SESSION, _SHARED_SESSION_LOOP
+    loop = asyncio.get_running_loop()
+    if _SHARED_SESSION is None or _SHARED_SESSION.is_closed or _SHARED_SESSION_LOOP is not loop:
+        _SHARED_SESSION = create_session()
+        _SHARED_SESSION_LOOP = loop
+    return _SHARED_SESSION
+
+
+async def close_shared_session():
+    """关闭共享HTTP会话（在事件循环结束前调用）"""
+    global _SHARED_SESSION
+    if _SHARED_SESSION is not None:
+        await _SHARED_SESSION.aclose()
+        _SHARED_SESSION = None
+
+
+def read_jsonl_results(jsonl_file: str):
+    """逐行读取JSONL结果（跳过空行和中断时写了一半的行）"""
+    if not os.path.exists(jsonl_file):
+        return
+    with open(jsonl_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json_loads(line)
+            except ValueError:
+                continue  # 中断时写了一半的行
+
+
+def failed_results(page_sources: List[Dict[str, str]], method: str, error: str = '') -> List[Dict[str, Any]]:
+    """页面爬取或处理失败时，为每个source生成没有示例的结果（method取FAILED_METHODS之一）"""
+    results = []
+    for source_info in page_sources:
+        result = {
+            'source_url': source_info['url'],
+            'api': source_info.get('api', ''),
+            'package': source_info.get('package', ''),
+            'change_type': source_info.get('change_type', ''),
+            'reason': source_info.get('reason', ''),
+            'has_examples': False,
+            'examples': [],
+            'examples_count': 0,
+            'extraction_method': method
+        }
+        if error:
+            result['error'] = error
+        results.append(result)
+    return results
+
+
+def read_done_sources(jsonl_file: str) -> set:
+    """
+    读取已写入JSONL的结果，返回已完成的(source_url, api)集合（用于断点续跑）；
+    爬取失败、处理失败的行不算完成，重跑时会再次处理
+    """
+    done = set()
+    for result in read_jsonl_results(jsonl_file):
+        key = (result.get('source_url', ''), result.get('api', ''))
+        if result.get('extraction_method') in FAILED_METHODS:
+            done.discard(key)
+        else:
+            done.add(key)
+    return done
+
+
+def jsonl_to_json(jsonl_file: str, output_file: str) -> int:
+    """
+    逐行把JSONL结果转换为缩进的JSON数组文件（格式与json.dump(indent=2)一致，不把全部结果读入内存），
+    同一(source_url, api)重跑过时只保留最后一行；返回写出的结果数
+    """
+    # 第一遍只记录每个(source_url, api)最后一行的位置
+    last_index = {}
+    for i, result in enumerate(read_jsonl_results(jsonl_file)):
+        last_index[(result.get('source_url', ''), result.get('api', ''))] = i
+    keep = set(last_index.values())
+
+    with open(output_file, 'w', encoding='utf-8') as dst:
+        first = True
+        for i, result in enumerate(read_jsonl_results(jsonl_file)):
+            if i not in keep:
+                continue
+            # JSON字符串内的换行已转义，按行缩进不会改变内容
+            dst.write(('[\n  ' if first else ',\n  ') + json_dumps(result, indent=True).replace('\n', '\n  '))
+            first = False
+        dst.write('[]' if first else '\n]')
+    return len(keep)
 
 
 class EnhancedLodashDocProcessor:
@@ -25,10 +481,10 @@ class EnhancedLodashDocProcessor:
         if self.use_gpt:
             try:
                 self.azure_deployment = azure_deployment
-                self.client = AzureOpenAI(
+                self.client = AsyncAzureOpenAI(
                     azure_endpoint=azure_endpoint,
                     api_key=azure_api_key,
-                    api_version="2024-02-15-preview"
+                    api_version=AZURE_API_VERSION
                 )
                 print("✅ GPT-4o API已启用 - 智能API匹配模式")
             except Exception as e:
@@ -37,11 +493,18 @@ class EnhancedLodashDocProcessor:
         else:
             print("ℹ️ GPT-4o未启用 - 将使用手动模式")
 
-        # 初始化爬虫会话
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # 异步HTTP会话在process_sources中获取（模块级共享，绑定到当前事件循环）
+        self.session = None
+        # 磁盘缓存和解析进程池在process_sources中创建
+        self.parse_executor = None
+        self.gpt_cache = None
+        self.http_cache = None
+        self.gpt_cache_hits = 0
+        self.not_modified_hits = 0
+        # 按页面内容指纹复用解析和分析（不同URL返回相同HTML时跳过解析和相关性判断）
+        self.block_cache = {}                # 内容指纹 -> 代码块列表（Future），只保留正在处理的页面
+        self.analysis_cache = OrderedDict()  # (内容指纹, 目标API) -> 分析结果（Task），最多ANALYSIS_CACHE_SIZE条
+        self.identical_page_hits = 0
 
     def read_csv_sources(self, csv_file: str) -> List[Dict[str, str]]:
         """读取CSV文件，提取source列的URL"""
@@ -62,11 +525,41 @@ class EnhancedLodashDocProcessor:
             print(f"读取CSV文件出错: {e}")
         return sources
 
-    def crawl_page(self, url: str) -> Optional[str]:
-        """爬取页面内容"""
+    async def crawl_page(self, url: str) -> Optional[str]:
+        """爬取页面内容（有缓存时发条件请求，未修改的页面直接使用缓存）"""
         try:
-            response = self.session.get(url, timeout=30)
+            entry = self.http_cache.get(url)
+            if entry is not None and time.time() - entry['cached_at'] >= HTTP_CACHE_EXPIRE:
+                entry = None
+            headers = {}
+            if entry is not None:
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+            for retry in range(HTTP_MAX_RETRIES + 1):
+                async with self.http_semaphore:
+                    response = await self.session.get(url, headers=headers)
+                if response.status_code not in HTTP_RETRY_STATUS or retry == HTTP_MAX_RETRIES:
+                    break
+                # 临时错误：释放并发槽位后退避重试
+                await asyncio.sleep(HTTP_RETRY_BACKOFF * 2 ** retry)
+
+            if response.status_code == 304 and entry is not None:
+                self.not_modified_hits += 1
+                return entry['html']
             response.raise_for_status()
+
+            etag = response.headers.get('etag', '')
+            last_modified = response.headers.get('last-modified', '')
+            if (etag or last_modified) and 'no-store' not in response.headers.get('cache-control', ''):
+                self.http_cache[url] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'cached_at': time.time(),
+                    'html': response.text
+                }
             return response.text
         except Exception as e:
             print(f"爬取页面失败 {url}: {e}")
@@ -74,98 +567,56 @@ class EnhancedLodashDocProcessor:
 
     def extract_all_code_blocks(self, html_content: str) -> List[Dict[str, Any]]:
         """提取页面中所有的代码块，不进行过滤"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        code_blocks = []
-
-        # 查找所有的pre标签
-        pre_tags = soup.find_all('pre')
-
-        for i, pre_tag in enumerate(pre_tags):
-            code_text = pre_tag.get_text().strip()
-            if not code_text:
-                continue
-
-            # 查找代码块之前的描述文本
-            description = ""
-            for prev in pre_tag.find_all_previous(['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'], limit=5):
-                text = prev.get_text().strip()
-                if text and len(text) > 10 and not text.startswith('Example') and not text.startswith('Code'):
-                    description = text
-                    break
-
-            code_blocks.append({
-                'index': i,
-                'code': code_text,
-                'description': description,
-                'element': pre_tag
-            })
+        return extract_code_blocks(html_content)
+
+    async def cached_chat(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """以JSON模式调用GPT并返回响应内容；相同模型和消息的响应从磁盘缓存读取"""
+        key_source = self.azure_deployment + json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+        cached = self.gpt_cache.get(key)
+        if cached is not None and time.time() - cached['cached_at'] < GPT_CACHE_TTL:
+            self.gpt_cache_hits += 1
+            return cached['content']
+
+        async with self.gpt_semaphore:
+            response = await self.client.chat.completions.create(
+                model=self.azure_deployment,
+                messages=messages,
+                temperature=0.1,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"}
+            )
 
-        return code_blocks
+        content = response.choices[0].message.content
+        # 先确认是合法JSON再缓存，避免缓存无法解析的响应
+        json_loads(content)
+        self.gpt_cache[key] = {'content': content, 'cached_at': time.time()}
+        return content
 
-    def filter_examples_with_gpt(self, code_blocks: List[Dict], target_api: str, page_url: str) -> List[Dict[str, Any]]:
+    async def filter_examples_with_gpt(self, code_blocks: List[Dict], target_api: str, page_url: str) -> List[Dict[str, Any]]:
         """使用GPT-4o智能识别与目标API相关的代码示例"""
         if not self.use_gpt or not code_blocks:
             return []
 
-        # 准备代码块文本用于分析
+        # 准备代码块文本用于分析：编号 + 是否出现目标API + 代码长度 + 代码开头
+        api_patterns = _keyword_patterns(target_api.replace('_.', '').strip())
         code_blocks_text = ""
         for i, block in enumerate(code_blocks):
-            code_blocks_text += f"代码块 {i+1}:\n```\n{block['code']}\n```\n"
+            code = block['code']
+            hits_api = any(pattern.search(code) for pattern in api_patterns)
+            code_blocks_text += f"[{i}] hits_api={hits_api} len={len(code)}\n{code[:PROMPT_CODE_CHARS]}\n"
             if block['description']:
-                code_blocks_text += f"描述: {block['description']}\n"
-            code_blocks_text += "\n" + "-"*50 + "\n\n"
-
-        prompt = f"""你是一个文档分析专家。请分析以下文档页面的代码块，识别哪些代码示例是专门用来演示API "{target_api}" 的。
+                code_blocks_text += f"描述: {block['description'][:PROMPT_DESCRIPTION_CHARS]}\n"
+            code_blocks_text += "---\n"
 
-页面URL: {page_url}
-
-所有代码块:
-{code_blocks_text}
-
-请按以下规则分析：
-1. 识别直接使用 "{target_api}" 函数的代码示例
-2. 识别演示 "{target_api}" 核心功能的示例
-3. 排除只使用其他Lodash函数的示例
-4. 排除与 "{target_api}" 无关的通用示例
-5. 如果示例中同时包含多个API，但主要演示的是 "{target_api}"，则包含它
-6. 注意代码描述中的提示，描述通常会说明这个示例演示的是哪个API
-
-请返回JSON格式，只包含与 "{target_api}" 相关的代码示例：
-{{
-    "relevant_examples": [
-        {{
-            "block_index": 0,
-            "is_relevant": true,
-            "reason": "这个示例直接使用了{target_api}函数",
-            "confidence": 0.9
-        }},
-        {{
-            "block_index": 1,
-            "is_relevant": false,
-            "reason": "这个示例使用的是其他API",
-            "confidence": 0.1
-        }}
-    ]
-}}
-
-注意：
-- block_index 对应代码块在页面中的顺序（从0开始）
-- confidence 是0-1之间的置信度分数
-- 只返回is_relevant为true的示例的block_index列表"""
+        prompt = FILTER_PROMPT_TEMPLATE % (page_url, target_api, code_blocks_text)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.azure_deployment,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的Lodash文档分析专家，擅长识别代码示例与特定API的关联性。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=2000
-            )
-
-            content = response.choices[0].message.content.strip()
-            result = json.loads(content)
+            content = await self.cached_chat([
+                {"role": "system", "content": FILTER_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ], max_tokens=GPT_FILTER_MAX_TOKENS)
+            result = json_loads(content)
 
             # 提取相关的代码块
             relevant_blocks = []
@@ -189,40 +640,22 @@ class EnhancedLodashDocProcessor:
 
     def filter_examples_by_keywords(self, code_blocks: List[Dict], target_api: str) -> List[Dict[str, Any]]:
         """使用关键词匹配过滤示例（GPT失败时的回退方案）"""
-        relevant_blocks = []
+        return filter_code_blocks_by_keywords(code_blocks, target_api)
 
-        # 清理API名称，移除可能的别名前缀
+    def keyword_fast_path(self, code_blocks: List[Dict], target_api: str) -> Optional[List[Dict[str, Any]]]:
+        """关键词匹配结果无歧义（1~N个代码块，且都直接调用_.api(）时返回这些代码块，否则返回None"""
         clean_api = target_api.replace('_.', '').strip()
+        if not clean_api:
+            return None
+        kw_blocks = self.filter_examples_by_keywords(code_blocks, target_api)
+        if not 0 < len(kw_blocks) <= KEYWORD_FAST_PATH_MAX_BLOCKS:
+            return None
+        strict_re = _strict_call_pattern(clean_api)
+        if all(strict_re.search(block['code']) for block in kw_blocks):
+            return kw_blocks
+        return None
 
-        for block in code_blocks:
-            code = block['code']
-            description = block['description']
-
-            # 检查代码中是否包含目标API
-            api_patterns = [
-                rf'_\.{clean_api}',
-                rf'lodash\.{clean_api}',
-                rf'\.{clean_api}\(',
-                rf'{clean_api}\(',
-                rf'["\'`]{clean_api}["\'`]'  # 字符串中提到API名
-            ]
-
-            found_api = any(re.search(pattern, code, re.IGNORECASE) for pattern in api_patterns)
-
-            # 检查描述中是否提到API
-            description_mention = clean_api.lower() in description.lower() if description else False
-
-            if found_api or description_mention:
-                relevant_blocks.append({
-                    **block,
-                    'keyword_confidence': 0.7 if found_api else 0.5,
-                    'keyword_reason': f"关键词匹配: {clean_api}"
-                })
-
-        print(f"关键词匹配识别出 {len(relevant_blocks)} 个与 {target_api} 相关的示例")
-        return relevant_blocks
-
-    def extract_and_separate_examples(self, relevant_blocks: List[Dict], target_api: str) -> List[Dict[str, str]]:
+    async def extract_and_separate_examples(self, relevant_blocks: List[Dict], target_api: str) -> List[Dict[str, str]]:
         """分离相关代码块为独立的示例"""
         if not relevant_blocks:
             return []
@@ -234,63 +667,20 @@ class EnhancedLodashDocProcessor:
 
         # 使用GPT分离示例
         if self.use_gpt:
-            return self.extract_examples_gpt(mixed_code, target_api)
+            return await self.extract_examples_gpt(mixed_code, target_api)
         else:
             return self.extract_examples_manual(mixed_code, target_api)
 
-    def extract_examples_gpt(self, mixed_code: str, target_api: str) -> List[Dict[str, str]]:
+    async def extract_examples_gpt(self, mixed_code: str, target_api: str) -> List[Dict[str, str]]:
         """使用GPT-4o提取并分离代码示例"""
-        prompt = f"""你是一个JavaScript代码分析专家。请分析以下Lodash代码示例，专注于API "{target_api}"，将其分离为独立的代码示例，每个示例包含输入代码和对应的输出。
-
-规则：
-1. 只分析与 "{target_api}" 相关的代码示例
-2. 识别独立的代码示例块（通常包含Lodash函数调用）
-3. 每个示例应该包含完整的输入代码和对应的输出
-4. 保持代码的原始格式和缩进
-5. 错误信息也属于输出
-6. 如果有多个相关的代码行，将它们组合为一个示例
-7. **重要**：不要提取只有import/require语句的示例
-8. 确保每个示例都包含 "{target_api}" 的使用
-
-混合的代码：
-```
-{mixed_code}
-```
-
-请以JSON格式返回提取的结果：
-[
-    {{
-        "code": "输入代码1，包含必要的require/import语句",
-        "output": "对应的输出1"
-    }},
-    {{
-        "code": "输入代码2，包含必要的require/import语句",
-        "output": "对应的输出2"
-    }}
-]
-
-注意：
-- 每个code字段都应该包含完整的可执行代码，包括必要的require/import语句
-- 保持代码的原始缩进和格式
-- 不要添加任何额外的解释文字
-- 如果没有输出，output字段设为空字符串
-- **重要**：跳过只有require/import语句而没有实际操作的示例
-- **重要**：确保每个示例都演示了 "{target_api}" 的用法"""
+        prompt = EXTRACT_PROMPT_TEMPLATE % (target_api, mixed_code)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.azure_deployment,
-                messages=[
-                    {"role": "system", "content": f"你是一个专业的JavaScript代码分析专家，擅长识别和分离Lodash {target_api} 的代码示例。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=3000
-            )
-
-            content = response.choices[0].message.content.strip()
-            result = json.loads(content)
-            return result
+            content = await self.cached_chat([
+                {"role": "system", "content": EXTRACT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ], max_tokens=GPT_EXTRACT_MAX_TOKENS)
+            return json_loads(content).get('examples', [])
 
         except Exception as e:
             print(f"GPT提取失败: {e}，回退到手动分离")
@@ -308,22 +698,14 @@ class EnhancedLodashDocProcessor:
         # 清理API名称
         clean_api = target_api.replace('_.', '').strip()
 
-        # 检查是否包含Lodash引用
-        has_lodash_import = any(
-            ('import' in line and ('lodash' in line or '_' in line)) or
-            ('require' in line and ('lodash' in line or '_' in line))
-            for line in lines
-        )
+        # 检查是否包含Lodash引用（对整段代码一次正则扫描）
+        has_lodash_import = _LODASH_IMPORT_RE.search(mixed_code) is not None
 
         for line in lines:
             stripped = line.strip()
 
             # 检测新的示例开始
-            if ((stripped.startswith('>>>') or stripped.startswith('//') or
-                 re.match(r'^(_|lodash|\w+)', stripped)) and
-                ('=' in stripped or any(x in stripped for x in ['_.', 'function', '=>']) or
-                 stripped.startswith('>>> console')) and
-                current_example['code_lines']):
+            if current_example['code_lines'] and _EXAMPLE_START_RE.match(stripped):
 
                 # 保存当前示例（只有在有实际代码内容时）
                 if self._has_actual_code(current_example['code_lines'], clean_api):
@@ -337,8 +719,7 @@ class EnhancedLodashDocProcessor:
                     'code_lines': [line],
                     'output_lines': []
                 }
-            elif (stripped.startswith('>>>') or stripped.startswith('...') or
-                  stripped.startswith('//') or re.match(r'^(_|lodash|\w+)', stripped)):
+            elif _EXAMPLE_CODE_RE.match(stripped):
                 # 继续当前示例的输入代码
                 current_example['code_lines'].append(line)
             else:
@@ -356,45 +737,18 @@ class EnhancedLodashDocProcessor:
         return examples
 
     def _has_actual_code(self, code_lines: List[str], target_api: str) -> bool:
-        """检查代码行是否包含实际的功能代码且与目标API相关"""
+        """检查代码行是否包含实际的功能代码且与目标API相关（整段代码一次正则扫描）"""
         if not code_lines:
             return False
-
-        # 检查是否有非import/require的代码行且包含目标API
-        has_target_api = False
-        has_actual_code = False
-
-        for line in code_lines:
-            stripped = line.strip()
-            if stripped.startswith('>>>'):
-                code_content = stripped[3:].strip()
-                if code_content and not code_content.startswith('import') and not code_content.startswith('require'):
-                    has_actual_code = True
-                    if re.search(rf'\.{target_api}\s*\(', code_content) or target_api in code_content:
-                        has_target_api = True
-            elif stripped.startswith('...'):
-                code_content = stripped[3:].strip()
-                if code_content:
-                    has_actual_code = True
-                    if re.search(rf'\.{target_api}\s*\(', code_content) or target_api in code_content:
-                        has_target_api = True
-            elif stripped and not stripped.startswith('//'):
-                if re.search(r'_\.|function|\w+\s*=|console\.|return', stripped):
-                    has_actual_code = True
-                    if re.search(rf'\.{target_api}\s*\(', stripped) or target_api in stripped:
-                        has_target_api = True
-
-        return has_actual_code and has_target_api
+        return _actual_code_pattern(target_api).search('\n'.join(code_lines)) is not None
 
     def _format_code(self, code_lines: List[str], has_lodash_import: bool) -> str:
         """格式化代码行，去除>>>和...前缀，为每个示例添加完整的require语句"""
         formatted_lines = []
 
         if has_lodash_import:
-            has_require = any('require' in line and ('lodash' in line or '_' in line) for line in code_lines)
-            has_import = any('import' in line and ('lodash' in line or '_' in line) for line in code_lines)
-
-            if not (has_require or has_import):
+            # 示例中已有Lodash引用语句时不再补充
+            if not any(_LODASH_IMPORT_RE.search(line) for line in code_lines):
                 formatted_lines.append("const _ = require('lodash');")
 
         for line in code_lines:
@@ -411,29 +765,82 @@ class EnhancedLodashDocProcessor:
 
         return '\n'.join(formatted_lines)
 
-    def process_single_source(self, source_info: Dict[str, str]) -> Dict[str, Any]:
+    async def process_single_source(self, source_info: Dict[str, str]) -> Dict[str, Any]:
         """处理单个source，使用GPT智能匹配API与示例"""
-        url = source_info['url']
-        target_api = source_info.get('api', '')
-        print(f"正在处理: {url} (目标API: {target_api})")
+        results = await self.process_page_sources(canonical_url(source_info['url']), [source_info])
+        return results[0]
+
+    async def process_page_sources(self, url: str, page_sources: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """处理指向同一页面的所有source：页面只爬取和解析一次，再分别匹配各自的目标API"""
+        target_apis = ', '.join(source_info.get('api', '') for source_info in page_sources)
+        print(f"正在处理: {url} (目标API: {target_apis})")
 
         # 爬取页面
-        html_content = self.crawl_page(url)
+        html_content = await self.crawl_page(url)
         if not html_content:
-            return {
-                'source_url': url,
-                'api': target_api,
-                'package': source_info.get('package', ''),
-                'change_type': source_info.get('change_type', ''),
-                'reason': source_info.get('reason', ''),
-                'has_examples': False,
-                'examples': [],
-                'examples_count': 0,
-                'extraction_method': 'Crawl Failed'
-            }
+            return failed_results(page_sources, 'Crawl Failed')
+
+        # 同一页面内容、同一目标API只分析一次，其余行复用结果并保留各自的元数据
+        digest = html_digest(html_content)
+        api_tasks = {}
+        for source_info in page_sources:
+            target_api = source_info.get('api', '')
+            if target_api not in api_tasks:
+                api_tasks[target_api] = self.analysis_cache.get((digest, target_api))
+                if api_tasks[target_api] is not None:
+                    self.analysis_cache.move_to_end((digest, target_api))
+
+        blocks_future = None
+        missing = [target_api for target_api, task in api_tasks.items() if task is None]
+        if not missing:
+            self.identical_page_hits += 1
+        else:
+            # 提取所有代码块（HTML解析是CPU密集操作，放到进程池中执行，不阻塞事件循环且可利用多核）
+            # 并发到达的相同页面等待同一次解析
+            blocks_future = self.block_cache.get(digest)
+            if blocks_future is None:
+                loop = asyncio.get_running_loop()
+                blocks_future = loop.run_in_executor(self.parse_executor, extract_code_blocks, html_content)
+                self.block_cache[digest] = blocks_future
+            else:
+                self.identical_page_hits += 1
+            # 在等待解析之前登记分析任务，并发到达的相同页面直接复用
+            sources_by_api = {source_info.get('api', ''): source_info for source_info in reversed(page_sources)}
+            for target_api in missing:
+                task = asyncio.ensure_future(self.analyze_parsed_page(sources_by_api[target_api], blocks_future))
+                api_tasks[target_api] = self.analysis_cache[(digest, target_api)] = task
+                if len(self.analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self.analysis_cache.popitem(last=False)
+        del html_content
+
+        try:
+            analyzed = await asyncio.gather(*api_tasks.values())
+        finally:
+            # 本页面的分析完成后不再持有代码块列表（已完成的分析结果保留在analysis_cache中）
+            if blocks_future is not None and self.block_cache.get(digest) is blocks_future:
+                del self.block_cache[digest]
+        api_results = dict(zip(api_tasks, analyzed))
+
+        return [{
+            **api_results[source_info.get('api', '')],
+            'source_url': source_info['url'],
+            'package': source_info.get('package', ''),
+            'change_type': source_info.get('change_type', ''),
+            'reason': source_info.get('reason', '')
+        } for source_info in page_sources]
+
+    async def analyze_parsed_page(self, source_info: Dict[str, str], blocks_future: asyncio.Future) -> Dict[str, Any]:
+        """等待页面解析完成后分析目标API"""
+        all_code_blocks = await blocks_future
+        if all_code_blocks:
+            print(f"页面中共找到 {len(all_code_blocks)} 个代码块")
+        return await self.analyze_page(source_info, all_code_blocks)
+
+    async def analyze_page(self, source_info: Dict[str, str], all_code_blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """从页面的代码块中提取与目标API相关的示例"""
+        url = source_info['url']
+        target_api = source_info.get('api', '')
 
-        # 提取所有代码块
-        all_code_blocks = self.extract_all_code_blocks(html_content)
         if not all_code_blocks:
             return {
                 'source_url': url,
@@ -447,10 +854,11 @@ class EnhancedLodashDocProcessor:
                 'extraction_method': 'No Code Blocks'
             }
 
-        print(f"页面中共找到 {len(all_code_blocks)} 个代码块")
-
-        # 使用GPT智能识别相关示例
-        relevant_blocks = self.filter_examples_with_gpt(all_code_blocks, target_api, url)
+        # 关键词匹配无歧义时直接采用，否则使用GPT智能识别相关示例
+        relevant_blocks = self.keyword_fast_path(all_code_blocks, target_api) if self.use_gpt else None
+        fast_path = relevant_blocks is not None
+        if not fast_path:
+            relevant_blocks = await self.filter_examples_with_gpt(all_code_blocks, target_api, url)
         if not relevant_blocks:
             return {
                 'source_url': url,
@@ -464,11 +872,14 @@ class EnhancedLodashDocProcessor:
                 'extraction_method': 'No Relevant Examples'
             }
 
-        print(f"GPT识别出 {len(relevant_blocks)} 个相关代码块")
+        print(f"{'关键词快速匹配' if fast_path else 'GPT识别'}出 {len(relevant_blocks)} 个相关代码块")
 
         # 分离代码示例
-        separated_examples = self.extract_and_separate_examples(relevant_blocks, target_api)
-        method = "GPT-4o Enhanced" if self.use_gpt else "Manual Enhanced"
+        separated_examples = await self.extract_and_separate_examples(relevant_blocks, target_api)
+        if fast_path:
+            method = "Keyword Fast Path"
+        else:
+            method = "GPT-4o Enhanced" if self.use_gpt else "Manual Enhanced"
 
         return {
             'source_url': url,
@@ -484,8 +895,8 @@ class EnhancedLodashDocProcessor:
             'relevant_blocks_found': len(relevant_blocks)
         }
 
-    def process_sources(self, csv_file: str, output_file: str = 'enhanced_lodash_examples.json', limit: int = None):
-        """处理所有source并生成智能匹配的示例"""
+    async def process_sources(self, csv_file: str, output_file: str = 'enhanced_lodash_examples.json', limit: int = None):
+        """处理所有source并生成智能匹配的示例（并发爬取，完成一条写入一条JSONL，支持断点续跑）"""
         sources = self.read_csv_sources(csv_file)
         print(f"找到 {len(sources)} 个source URL")
 
@@ -493,9 +904,17 @@ class EnhancedLodashDocProcessor:
             sources = sources[:limit]
             print(f"限制处理前 {limit} 个source")
 
-        all_results = []
+        # 结果逐条追加到JSONL，已完成的source直接跳过
+        jsonl_file = os.path.splitext(output_file)[0] + '.jsonl'
+        done = read_done_sources(jsonl_file)
+        if done:
+            sources = [source for source in sources if (source['url'], source.get('api', '')) not in done]
+            print(f"发现 {len(done)} 个已完成的API（{jsonl_file}），剩余 {len(sources)} 个source")
+
         stats = {
-            'total_sources': len(sources),
+            'total_sources': len(sources),          # 本次处理的source数
+            'previously_done_sources': len(done),   # 之前运行已完成的source数
+            'output_sources': 0,                    # 结果文件中的source总数（含之前运行的结果）
             'with_examples': 0,
             'without_examples': 0,
             'total_examples_extracted': 0,
@@ -504,10 +923,20 @@ class EnhancedLodashDocProcessor:
             'method_used': []
         }
 
-        for i, source in enumerate(sources):
-            print(f"处理进度: {i+1}/{len(sources)}")
-            result = self.process_single_source(source)
-            all_results.append(result)
+        completed = 0
+        first_results = []  # 报告中的示例只需要前几条结果
+
+        def record(result):
+            """结果写入JSONL，更新统计信息并显示处理结果（按完成顺序）"""
+            nonlocal completed
+            i = completed
+            completed += 1
+            print(f"处理进度: {completed}/{len(sources)}")
+
+            outf.write(json_dumps(result) + '\n')
+            outf.flush()
+            if i < 5:
+                first_results.append(result)
 
             # 更新统计信息
             if result['has_examples']:
@@ -539,34 +968,66 @@ class EnhancedLodashDocProcessor:
                     print(f"代码预览: {example['code'][:150]}...")
                 print(f"{'='*60}")
 
-            # API调用间隔
-            if self.use_gpt:
-                time.sleep(0.5)
-            time.sleep(1)
+        # 按URL分组：同一页面只爬取、解析一次
+        url_to_indices = {}
+        for i, source in enumerate(sources):
+            url_to_indices.setdefault(canonical_url(source['url']), []).append(i)
+        if len(url_to_indices) < len(sources):
+            print(f"去重后需要爬取 {len(url_to_indices)} 个页面")
 
-        # 保存结果
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_results, f, ensure_ascii=False, indent=2)
+        async def run(url, indices):
+            page_sources = [sources[i] for i in indices]
+            try:
+                results = await self.process_page_sources(url, page_sources)
+            except Exception as e:
+                # 单个页面出错只影响该页面的source，不中断gather中的其他页面
+                print(f"处理失败: {url} - {e!r}")
+                results = failed_results(page_sources, 'Processing Failed', repr(e))
+            for result in results:
+                record(result)
+
+        self.http_semaphore = asyncio.Semaphore(HTTP_CONCURRENCY)
+        self.gpt_semaphore = asyncio.Semaphore(GPT_CONCURRENCY)
+        self.gpt_cache = shelve.open(GPT_CACHE_FILE)
+        self.http_cache = shelve.open(HTTP_CACHE_FILE)
+        self.parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        outf = open(jsonl_file, 'a', encoding='utf-8')
+        self.session = get_shared_session()
+        try:
+            await asyncio.gather(*[run(url, indices) for url, indices in url_to_indices.items()])
+        finally:
+            outf.close()
+            self.parse_executor.shutdown()
+            # 缓存中的Future绑定当前事件循环和进程池，运行结束后清空
+            self.block_cache.clear()
+            self.analysis_cache.clear()
+            self.gpt_cache.close()
+            self.http_cache.close()
+
+        # 保存结果（包含之前运行已完成的结果）
+        stats['output_sources'] = jsonl_to_json(jsonl_file, output_file)
 
         # 生成报告
-        self.generate_report(stats, all_results)
+        self.generate_report(stats, first_results)
 
         print(f"\n{'='*60}")
         print(f" 处理完成！")
         print(f" 统计信息:")
-        print(f"  总source数: {stats['total_sources']}")
+        print(f"  本次处理source数: {stats['total_sources']}（之前已完成: {stats['previously_done_sources']}）")
+        print(f"  结果文件中的source总数: {stats['output_sources']}")
         print(f"  有Examples: {stats['with_examples']}")
         print(f"  无Examples: {stats['without_examples']}")
         print(f"  总代码块数: {stats['total_blocks_found']}")
         print(f"  相关代码块数: {stats['relevant_blocks_found']}")
         print(f"  提取的示例总数: {stats['total_examples_extracted']}")
+        print(f"  GPT缓存命中: {self.gpt_cache_hits}，页面未修改(304): {self.not_modified_hits}，相同页面内容: {self.identical_page_hits}")
         if self.use_gpt:
             print(f"  使用GPT-4o智能匹配: {len(stats['method_used'])}")
-        print(f" 结果已保存到: {output_file}")
+        print(f" 结果已保存到: {output_file}（逐条结果: {jsonl_file}）")
         print(f" 详细报告已保存到: enhanced_lodash_processing_report.json")
         print(f"{'='*60}")
 
-        return all_results
+        return stats
 
     def generate_report(self, stats: Dict, results: List[Dict]):
         """生成处理报告"""
@@ -591,8 +1052,7 @@ class EnhancedLodashDocProcessor:
                 report['sample_results'].append(sample_info)
 
         # 保存报告
-        with open('enhanced_lodash_processing_report.json', 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        write_json_file(report, 'enhanced_lodash_processing_report.json')
 
 
 def main():
@@ -614,8 +1074,14 @@ def main():
         use_gpt=True  # 默认启用GPT智能匹配
     )
 
+    async def run():
+        try:
+            await processor.process_sources(csv_file, output_file, limit=limit)
+        finally:
+            await close_shared_session()
+
     # 开始处理
-    processor.process_sources(csv_file, output_file, limit=limit)
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
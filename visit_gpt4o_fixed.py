@@ -1,22 +1,364 @@
 import os
+import re
 import time
 import json
+import atexit
+import random
+import shelve
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, Tag, NavigableString, CData, UnicodeDammit
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+
+try:
+    # 安装httpx[http2]（h2包）后异步客户端启用HTTP/2：同一站点的并发请求复用一条TCP+TLS连接
+    import h2  # noqa: F401
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+try:
+    # 安装lxml后BeautifulSoup使用C实现的解析器（libxml2），比纯Python的html.parser快一个数量级；
+    # 同时直接在lxml树上定位目标API部分并提取文本，不再构建BeautifulSoup树
+    from lxml import etree
+    import lxml.html
+    BS_PARSER = "lxml"
+except ImportError:
+    etree = None
+    BS_PARSER = "html.parser"
+
+try:
+    # tiktoken按模型的分词器精确计算token数，未安装时按字符数粗略估计
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    # orjson（Rust实现）的序列化/反序列化比标准库json快数倍，未安装时回退到json
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False）"""
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        """序列化为str（输出UTF-8原文，等价于ensure_ascii=False）"""
+        return json.dumps(obj, ensure_ascii=False)
 
 # OpenAI配置 - 使用GPT-4o
 OPENAI_API_KEY = "xxx"
 OPENAI_MODEL = "gpt-4o"
+LLM_MAX_TOKENS = 1000                 # 单次响应的token上限
+INPUT_TOKEN_BUDGET = 2500             # 单次提示词（说明 + URL + 网页内容）的token上限，网页内容按剩余额度截断
+# 账号的每分钟请求数/token数额度（按账号等级调整），调用前按额度主动限速，避免批量任务反复撞上429
+OPENAI_MAX_REQUESTS_PER_MINUTE = 500
+OPENAI_MAX_TOKENS_PER_MINUTE = 30000
+RATE_LIMIT_DECREASE = 0.9             # 仍然遇到429时额度乘以该系数
+RATE_LIMIT_RECOVERY_DELAY = 60        # 最后一次429之后经过这么久（秒）开始恢复额度
+RATE_LIMIT_RECOVERY_RATE = 0.05       # 恢复期间每分钟加回配置额度的这个比例，直到恢复为配置值
+# LLM重试配置：只重试临时错误（429、超时、连接失败、5xx），等待时间指数增长并加随机抖动，
+# 避免并发任务同时重试；400、认证失败等错误重试也不会成功，直接抛出
+LLM_MAX_ATTEMPTS = 5
+LLM_BACKOFF_MAX = 60                  # 单次等待上限（秒）
+LLM_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+LLM_CONCURRENCY = 8                   # 多线程批量处理时同时进行的同步GPT调用数（与下载并发数分开限制）
+# GPT响应磁盘缓存（shelve）：相同模型和提示词（URL + 截断后的网页内容）直接返回上次的结果
+LLM_CACHE_FILE = ".visit_gpt4o_cache"
+LLM_CACHE_TTL = 7 * 86400             # 缓存有效期（秒）
+# 条件请求缓存（shelve）：保存页面的ETag/Last-Modified及提取出的文本，重跑时页面未修改(304)直接复用文本
+PAGE_CACHE_FILE = ".visit_gpt4o_pages"
+PAGE_CACHE_TTL = 86400                # 缓存有效期（秒），过期后重新完整下载
+
+# HTTP连接池配置（复用TCP/TLS连接）：批量URL分布在许多文档站点（readthedocs、numpy.org等），
+# 按站点缓存的连接池数要覆盖这些站点，否则连接池被挤出后又要重新握手
+HTTP_POOL_CONNECTIONS = 32            # 缓存的站点连接池数
+HTTP_POOL_MAXSIZE = 64                # 每个站点保留的keep-alive连接数
+HTTP_MAX_RETRIES = 3                  # 瞬时错误（429/5xx）由urllib3自动重试，并遵守Retry-After
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# 定位目标API部分时：遇到标题标签且标题文字含这些关键词，视为下一个API section的开始
+HEADING_TAGS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+SECTION_KEYWORDS = ("class", "function", "method", "api")
+STREAM_CHUNK_SIZE = 64 * 1024         # 流式下载时每次读取的字节数
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024  # 单个网页最多读取的字节数（解压后），超出部分不下载
+
+
+def build_session():
+    """创建共享的requests会话（连接池在多线程间复用）"""
+    session = requests.Session()
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=1,
+        backoff_jitter=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HTTP_HEADERS)
+    return session
+
+
+def build_async_client(max_connections=50):
+    """创建异步HTTP客户端（供asyncio批量爬取使用，一个事件循环承载大量并发请求）"""
+    return httpx.AsyncClient(
+        headers=HTTP_HEADERS,
+        timeout=httpx.Timeout(15.0, connect=5.0),
+        # 自定义transport时，连接池上限和http2必须设置在transport上（AsyncClient的同名参数会被忽略）
+        transport=httpx.AsyncHTTPTransport(
+            retries=HTTP_MAX_RETRIES,  # 连接失败自动重试
+            http2=HTTP2_ENABLED,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        ),
+        follow_redirects=True,
+    )
+
+
+if tiktoken is not None:
+    try:
+        _TOKEN_ENCODING = tiktoken.encoding_for_model(OPENAI_MODEL)
+    except KeyError:
+        _TOKEN_ENCODING = tiktoken.get_encoding("o200k_base")
+else:
+    _TOKEN_ENCODING = None
+
+
+def count_tokens(text):
+    """计算文本的token数（没有tiktoken时估计：ASCII约4个字符一个token，中文等非ASCII字符约一个字符一个token）"""
+    if _TOKEN_ENCODING is not None:
+        return len(_TOKEN_ENCODING.encode(text))
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def truncate_to_tokens(text, max_tokens):
+    """截断到不超过max_tokens个token，未超出时返回None（没有tiktoken时按估计的token数等比例截断字符）"""
+    if _TOKEN_ENCODING is not None:
+        ids = _TOKEN_ENCODING.encode(text)
+        if len(ids) <= max_tokens:
+            return None
+        return _TOKEN_ENCODING.decode(ids[:max_tokens])
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return None
+    return text[:len(text) * max_tokens // tokens]
+
+
+class RateLimiter:
+    """
+    RPM/TPM令牌桶（多线程和asyncio共用）：
+    - 两个桶按time.monotonic()经过的时间连续补充，每分钟补满一次
+    - 调用前扣除1个请求和预计的token数，额度不足时等待到够用为止
+    - 仍然遇到429时按RATE_LIMIT_DECREASE降低额度；RATE_LIMIT_RECOVERY_DELAY内没有再遇到429时，
+      按RATE_LIMIT_RECOVERY_RATE逐步加回，最多恢复到配置的额度（临时限流过后不会一直保持低额度）
+    - rate_limited_count累计遇到的429次数（llm内部重试掉的429也计入），供调用方的并发控制器读取
+    """
+
+    def __init__(self, max_requests_per_minute, max_tokens_per_minute):
+        self.configured_requests_per_minute = max_requests_per_minute
+        self.configured_tokens_per_minute = max_tokens_per_minute
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._last_rate_limited = None
+        self.rate_limited_count = 0
+        self.available_request_capacity = max_requests_per_minute
+        self.available_token_capacity = max_tokens_per_minute
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        if self._last_rate_limited is not None and now - self._last_rate_limited >= RATE_LIMIT_RECOVERY_DELAY:
+            # 加性恢复：每分钟加回配置额度的RATE_LIMIT_RECOVERY_RATE
+            recovery = elapsed / 60 * RATE_LIMIT_RECOVERY_RATE
+            self.max_requests_per_minute = min(
+                self.configured_requests_per_minute,
+                self.max_requests_per_minute + recovery * self.configured_requests_per_minute,
+            )
+            self.max_tokens_per_minute = min(
+                self.configured_tokens_per_minute,
+                self.max_tokens_per_minute + recovery * self.configured_tokens_per_minute,
+            )
+            if (self.max_requests_per_minute == self.configured_requests_per_minute
+                    and self.max_tokens_per_minute == self.configured_tokens_per_minute):
+                self._last_rate_limited = None
+        self.available_request_capacity = min(
+            self.max_requests_per_minute,
+            self.available_request_capacity + elapsed * self.max_requests_per_minute / 60,
+        )
+        self.available_token_capacity = min(
+            self.max_tokens_per_minute,
+            self.available_token_capacity + elapsed * self.max_tokens_per_minute / 60,
+        )
+
+    def _try_acquire(self, request_tokens):
+        """额度足够时扣除并返回0，否则返回还需等待的秒数"""
+        with self._lock:
+            self._refill()
+            # 超过整桶额度的请求最多等到桶满，避免永远等不到
+            request_tokens = min(request_tokens, self.max_tokens_per_minute)
+            if self.available_request_capacity >= 1 and self.available_token_capacity >= request_tokens:
+                self.available_request_capacity -= 1
+                self.available_token_capacity -= request_tokens
+                return 0
+            return max(
+                (1 - self.available_request_capacity) * 60 / self.max_requests_per_minute,
+                (request_tokens - self.available_token_capacity) * 60 / self.max_tokens_per_minute,
+            )
+
+    def acquire(self, request_tokens):
+        """阻塞直到额度足够（同步调用）"""
+        while True:
+            wait = self._try_acquire(request_tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, request_tokens):
+        """等待直到额度足够（不阻塞事件循环）"""
+        while True:
+            wait = self._try_acquire(request_tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def on_rate_limited(self):
+        """遇到429说明实际额度比配置的低，降低额度"""
+        with self._lock:
+            self._refill()
+            self.rate_limited_count += 1
+            self._last_rate_limited = time.monotonic()
+            self.max_requests_per_minute = max(1, self.max_requests_per_minute * RATE_LIMIT_DECREASE)
+            self.max_tokens_per_minute = max(LLM_MAX_TOKENS, self.max_tokens_per_minute * RATE_LIMIT_DECREASE)
+            self.available_request_capacity = min(self.available_request_capacity, self.max_requests_per_minute)
+            self.available_token_capacity = min(self.available_token_capacity, self.max_tokens_per_minute)
+
+
+def llm_retry_delay(attempt):
+    """第attempt次失败后的等待时间：指数退避 + 0~1秒随机抖动"""
+    return min(LLM_BACKOFF_MAX, 2 ** attempt) + random.random()
+
+
+def estimate_request_tokens(messages, max_tokens=LLM_MAX_TOKENS):
+    """预计一次调用消耗的token数：提示词token数 + 响应上限"""
+    return sum(count_tokens(message["content"]) for message in messages) + max_tokens
+
+
+class ShelveCache:
+    """shelve磁盘缓存：首次使用时打开，多线程共用（shelve本身不是线程安全的，读写加锁），进程退出时关闭"""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._db is None:
+            self._db = shelve.open(self.path)
+            atexit.register(self.close)
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class ResponseCache(ShelveCache):
+    """GPT响应缓存：键为模型和提示词的哈希"""
+
+    @staticmethod
+    def key(messages):
+        key_source = OPENAI_MODEL + json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def get(self, messages):
+        """返回未过期的缓存响应，没有时返回None"""
+        key = self.key(messages)
+        with self._lock:
+            entry = self._open().get(key)
+            if entry is None or time.time() - entry["cached_at"] >= self.ttl:
+                return None
+            self.hits += 1
+        return entry["content"]
+
+    def set(self, messages, content):
+        """缓存响应（先确认是合法JSON，避免缓存无法解析的响应）"""
+        try:
+            json_loads(content)
+        except ValueError:
+            return
+        with self._lock:
+            self._open()[self.key(messages)] = {"content": content, "cached_at": time.time()}
+
+
+class PageCache(ShelveCache):
+    """条件请求缓存：URL -> ETag/Last-Modified及提取出的文本（文本保存在磁盘上，不随爬取的URL数占用内存）"""
+
+    def get(self, url):
+        """返回未过期的缓存条目，没有时返回None"""
+        with self._lock:
+            entry = self._open().get(url)
+        if entry is None or time.time() - entry["cached_at"] >= self.ttl:
+            return None
+        return entry
+
+    def set(self, url, response_headers, text):
+        """响应带ETag或Last-Modified（且未禁止缓存）时保存提取出的文本，供下次条件请求使用"""
+        etag = response_headers.get("ETag", "")
+        last_modified = response_headers.get("Last-Modified", "")
+        if (etag or last_modified) and "no-store" not in response_headers.get("Cache-Control", ""):
+            with self._lock:
+                self._open()[url] = {"etag": etag, "last_modified": last_modified, "text": text, "cached_at": time.time()}
 
-# 严格的事实提取提示词 - 只提取页面中明确且可验证的信息，严禁编造任何内容
-extractor_prompt = """CRITICAL: Extract ONLY information that is explicitly and verifiably present in the webpage content. You must NOT invent, infer, or assume any information.
 
-## Target URL
-{url}
+# 模块级单例：所有实例共用一个响应缓存
+_RESPONSE_CACHE = ResponseCache(LLM_CACHE_FILE, LLM_CACHE_TTL)
+_PAGE_CACHE = PageCache(PAGE_CACHE_FILE, PAGE_CACHE_TTL)
 
-## Webpage Content
-{webpage_content}
+# 模块级单例：额度按账号计算，所有实例共用一个限速器
+_RATE_LIMITER = RateLimiter(OPENAI_MAX_REQUESTS_PER_MINUTE, OPENAI_MAX_TOKENS_PER_MINUTE)
+
+
+def rate_limited_count():
+    """进程内所有GPT调用累计遇到的429次数"""
+    return _RATE_LIMITER.rate_limited_count
+
+
+# 模块级单例：所有VisitGPT4o实例复用同一个同步客户端及其连接池；
+# 重试只由llm()/llm_async()/llm_stream()的退避循环负责（每次重试都经过限速器），关闭SDK自带的重试
+_OPENAI_CLIENT = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+
+# 严格的事实提取提示词 - 只提取页面中明确且可验证的信息，严禁编造任何内容
+# 说明部分作为system消息，每次调用逐字节相同（不做任何替换），可以命中OpenAI的提示词前缀缓存；
+# URL和网页内容放在其后的user消息中
+SYSTEM_PROMPT = """CRITICAL: Extract ONLY information that is explicitly and verifiably present in the webpage content. You must NOT invent, infer, or assume any information.
 
 ## STRICT INSTRUCTIONS
 
@@ -60,7 +402,7 @@ If you cannot answer YES to all three questions, DO NOT extract the information.
 ## JSON Output Format
 Please respond with a JSON object containing the following fields:
 
-{{
+{
   "api": "string",
   "package": "string",
   "language": "string",
@@ -70,7 +412,7 @@ Please respond with a JSON object containing the following fields:
   "change_type": "string",
   "reason": "string",
   "source": "string"
-}}
+}
 
 ## FINAL REMINDER
 - Your primary responsibility is TRUTH, not completeness
@@ -79,104 +421,327 @@ Please respond with a JSON object containing the following fields:
 - NEVER extract information about API changes from license files, general overviews, or basic API documentation unless explicit change statements are present
 - Please return your response as valid JSON format.
 """
+USER_PROMPT_TEMPLATE = "URL: {url}\n\nContent:\n{webpage_content}"
+# 模板只在导入时解析一次：拆成URL前、URL与网页内容之间、网页内容后三段，每次调用直接拼接
+_USER_PROMPT_PRE, _USER_PROMPT_MID, _USER_PROMPT_POST = re.split(r"\{url\}|\{webpage_content\}", USER_PROMPT_TEMPLATE)
+# 提示词中除URL和网页内容以外部分的token数（只计算一次）
+PROMPT_OVERHEAD_TOKENS = count_tokens(SYSTEM_PROMPT) + count_tokens(USER_PROMPT_TEMPLATE.format(url="", webpage_content=""))
+
+# 分组提示词：多个网页合并到一次请求中，说明和规则与单个网页的提示词相同，输出改为按网页编号的结果数组
+GROUP_SYSTEM_PROMPT = (
+    SYSTEM_PROMPT[:SYSTEM_PROMPT.index("## STRICT INSTRUCTIONS")]
+    + """The user message contains several webpages numbered "## URL 1", "## URL 2", ... Analyze EACH webpage independently: information found on one webpage must NEVER be used for another webpage.
+
+"""
+    + SYSTEM_PROMPT[SYSTEM_PROMPT.index("## STRICT INSTRUCTIONS"):SYSTEM_PROMPT.index("## JSON Output Format")]
+    + """## JSON Output Format
+Please respond with a JSON object containing a "results" array with exactly one object per webpage, in the same order. "index" is the webpage number, the other fields are the same for every webpage:
+
+{
+  "results": [
+    {
+      "index": 1,
+      "api": "string",
+      "package": "string",
+      "language": "string",
+      "deprecated_in": "string",
+      "removed_in": "string",
+      "replaced_by": "string",
+      "change_type": "string",
+      "reason": "string",
+      "source": "string"
+    }
+  ]
+}
+
+"""
+    + SYSTEM_PROMPT[SYSTEM_PROMPT.index("## FINAL REMINDER"):]
+)
+GROUP_USER_PROMPT_HEAD = 'The following {count} webpages are numbered "## URL 1" to "## URL {count}".\n\n'
+
+# 变更信息的触发词（与提示词中ACCEPTABLE EVIDENCE的关键词对应）：网页内容不含任何触发词时
+# （许可证、索引/概览、普通API文档），GPT也只能返回空字段，直接返回空结果不调用GPT
+CHANGE_TRIGGER_RE = re.compile(
+    r"\b(?:deprecat\w*|remov(?:ed|al)|obsolete\w*|supersed\w*|replac\w*|instead\s+of|since\s+version|migrat\w*)\b",
+    re.IGNORECASE,
+)
+RESULT_FIELDS = ("api", "package", "language", "deprecated_in", "removed_in", "replaced_by", "change_type", "reason", "source")
+# 没有变更信息时的结果（所有字段为空，与GPT按提示词返回的空结果格式一致）
+EMPTY_RESULT = json_dumps(dict.fromkeys(RESULT_FIELDS, ""))
 
 class VisitGPT4o:
+    # 所有实例共享同一个会话，避免每个URL重新握手
+    _session = build_session()
+    # 同步GPT调用的并发上限（call_batch的线程数可以大于它，下载不受限制）
+    _llm_semaphore = threading.BoundedSemaphore(LLM_CONCURRENCY)
+
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = _OPENAI_CLIENT
+        # 异步客户端的连接池绑定事件循环，按实例创建（批量爬取时只创建一个实例）
+        self.async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
     def llm(self, messages):
-        """调用OpenAI GPT-4o进行内容提取"""
-        max_retries = 3  # 减少重试次数
-        for attempt in range(max_retries):
+        """调用OpenAI GPT-4o进行内容提取（相同提示词优先使用缓存）"""
+        cached = _RESPONSE_CACHE.get(messages)
+        if cached is not None:
+            print("GPT缓存命中")
+            return cached
+        request_tokens = estimate_request_tokens(messages)
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            try:
+                _RATE_LIMITER.acquire(request_tokens)
+                with self._llm_semaphore:
+                    response = self.client.chat.completions.create(
+                        model=OPENAI_MODEL,  # 使用GPT-4o
+                        messages=messages,
+                        response_format={"type": "json_object"},
+                        max_tokens=LLM_MAX_TOKENS,  # 限制响应长度
+                        temperature=0.1,  # 降低随机性
+                        timeout=30,  # 30秒超时
+                    )
+                content = response.choices[0].message.content
+                if response.choices[0].finish_reason == "length":
+                    # 达到max_tokens时JSON不完整，不写入缓存，重试时重新请求
+                    print(f"⚠️ GPT响应达到max_tokens被截断")
+                    return content
+                _RESPONSE_CACHE.set(messages, content)
+                return content
+            except LLM_RETRYABLE_ERRORS as e:
+                if isinstance(e, RateLimitError):
+                    _RATE_LIMITER.on_rate_limited()
+                print(f"GPT API调用第{attempt+1}次失败: {str(e)}")
+                if attempt == LLM_MAX_ATTEMPTS - 1:
+                    raise e
+                time.sleep(llm_retry_delay(attempt))
+        return ""
+
+    async def llm_async(self, messages, max_tokens=LLM_MAX_TOKENS):
+        """llm()的异步版本，等待期间不占用线程"""
+        # shelve读写是阻塞的磁盘I/O，放到线程中
+        cached = await asyncio.to_thread(_RESPONSE_CACHE.get, messages)
+        if cached is not None:
+            print("GPT缓存命中")
+            return cached
+        request_tokens = estimate_request_tokens(messages, max_tokens)
+        for attempt in range(LLM_MAX_ATTEMPTS):
             try:
-                response = self.client.chat.completions.create(
-                    model=OPENAI_MODEL,  # 使用GPT-4o
+                await _RATE_LIMITER.acquire_async(request_tokens)
+                response = await self.async_client.chat.completions.create(
+                    model=OPENAI_MODEL,
                     messages=messages,
                     response_format={"type": "json_object"},
-                    max_tokens=1000,  # 限制响应长度
-                    temperature=0.1,  # 降低随机性
-                    timeout=30,  # 30秒超时
+                    max_tokens=max_tokens,
+                    temperature=0.1,
+                    timeout=30,
                 )
-                return response.choices[0].message.content
-            except Exception as e:
+                content = response.choices[0].message.content
+                if response.choices[0].finish_reason == "length":
+                    # 达到max_tokens时JSON不完整，不写入缓存，重试时重新请求
+                    print(f"⚠️ GPT响应达到max_tokens被截断")
+                    return content
+                await asyncio.to_thread(_RESPONSE_CACHE.set, messages, content)
+                return content
+            except LLM_RETRYABLE_ERRORS as e:
+                if isinstance(e, RateLimitError):
+                    _RATE_LIMITER.on_rate_limited()
                 print(f"GPT API调用第{attempt+1}次失败: {str(e)}")
-                if attempt == max_retries - 1:
+                if attempt == LLM_MAX_ATTEMPTS - 1:
                     raise e
-                time.sleep(3)  # 固定3秒等待时间
+                await asyncio.sleep(llm_retry_delay(attempt))
         return ""
 
-    def read_webpage(self, url):
-        """使用requests和BeautifulSoup读取网页内容，并定位到目标API部分"""
+    async def llm_stream(self, messages, max_tokens=LLM_MAX_TOKENS):
+        """
+        llm_async()的流式版本：边生成边产出响应内容片段，完整响应写入缓存（命中缓存时一次产出）；
+        只在建立请求时重试，响应因max_tokens被截断时在流结束时抛出ValueError
+        """
+        cached = await asyncio.to_thread(_RESPONSE_CACHE.get, messages)
+        if cached is not None:
+            print("GPT缓存命中")
+            yield cached
+            return
+        request_tokens = estimate_request_tokens(messages, max_tokens)
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            try:
+                await _RATE_LIMITER.acquire_async(request_tokens)
+                stream = await self.async_client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    max_tokens=max_tokens,
+                    temperature=0.1,
+                    timeout=30,
+                    stream=True,
+                )
+                break
+            except LLM_RETRYABLE_ERRORS as e:
+                if isinstance(e, RateLimitError):
+                    _RATE_LIMITER.on_rate_limited()
+                print(f"GPT API调用第{attempt+1}次失败: {str(e)}")
+                if attempt == LLM_MAX_ATTEMPTS - 1:
+                    raise e
+                await asyncio.sleep(llm_retry_delay(attempt))
+
+        parts = []
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+                yield choice.delta.content
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        if finish_reason == "length":
+            raise ValueError("GPT响应达到max_tokens被截断")
+        await asyncio.to_thread(_RESPONSE_CACHE.set, messages, "".join(parts))
+
+    def extract_content_lxml(self, html, target_api, encoding=None):
+        """
+        直接在lxml树上定位目标API部分并提取文本（文本提取在C中完成，不构建BeautifulSoup树），
+        结果与BeautifulSoup的get_text(separator='\n', strip=True)一致（template、rt、rp内的文本也会计入）；
+        lxml无法解析时返回None
+        """
         try:
-            import re
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-            }
-            response = requests.get(url, headers=headers, timeout=15)  # 增加超时时间
-            response.raise_for_status()  # 抛出HTTP错误
-            print(f"成功获取网页内容: {url} (长度: {len(response.text)})")
-
-            # 使用BeautifulSoup解析HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 提取目标API名称（从URL的hash部分）
-            target_api = ""
-            if "#" in url:
-                target_api = url.split("#")[-1]
-
-            # 尝试定位到目标API部分
-            if target_api:
-                # 方法1: 通过id属性查找对应的元素
-                target_element = soup.find(id=target_api)
-                if target_element:
-                    # 找到该元素及其后续兄弟元素，直到下一个主要API部分
-                    content_parts = []
-                    current = target_element
-
-                    # 添加目标元素的内容
-                    content_parts.append(str(current))
-
-                    # 添加后续兄弟元素，直到遇到下一个API section
-                    next_sibling = current.next_sibling
-                    while next_sibling:
-                        if hasattr(next_sibling, 'name'):
-                            # 如果遇到同级别的标题，停止
-                            if next_sibling.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6'] and next_sibling.get('id') != target_api:
-                                # 检查这个标题是否是另一个API section
-                                sibling_text = next_sibling.get_text().strip()
-                                if any(keyword in sibling_text.lower() for keyword in ['class', 'function', 'method', 'api']):
-                                    break
-                            content_parts.append(str(next_sibling))
-                        next_sibling = next_sibling.next_sibling
-
-                    # 创建新的soup对象来处理定位到的内容
-                    targeted_html = '\n'.join(content_parts)
-                    targeted_soup = BeautifulSoup(targeted_html, 'html.parser')
-
-                    # 移除脚本和样式标签
-                    for script in targeted_soup(["script", "style"]):
-                        script.decompose()
-
-                    # 添加一些上下文信息
-                    text = f"TARGET API: {target_api}\n"
-                    text += "TARGET API SECTION:\n"
-                    text += targeted_soup.get_text(separator='\n', strip=True)
-                    return text
-
+            if isinstance(html, bytes):
+                # 与BeautifulSoup相同的编码探测（响应头编码 -> <meta> -> 自动识别）
+                html = UnicodeDammit(html, [encoding] if encoding else [], is_html=True).unicode_markup
+            tree = lxml.html.document_fromstring(html)
+        except (ValueError, etree.ParserError):
+            return None
+        # 与BeautifulSoup流程中先移除script/style一致：清空元素本身（连同id），其后的文本仍作为单独的一段
+        for element in list(tree.iter("script", "style")):
+            element.clear(keep_tail=True)
+
+        target_element = tree.get_element_by_id(target_api, None) if target_api else None
+        if target_element is None:
             # 如果无法精确定位，则返回整个页面的内容
-            # 移除脚本和样式标签
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # 获取纯文本内容
-            text = soup.get_text(separator='\n', strip=True)
-
-            # 如果有目标API名称，在内容前添加提示
+            text = "\n".join(part.strip() for part in tree.itertext() if part.strip())
             if target_api:
                 text = f"TARGET API: {target_api}\nFULL PAGE CONTENT:\n{text}"
+            return text
+
+        # 元素内各段文本去空白后按行拼接；兄弟元素之间的文本是前一个元素的tail
+        texts = list(target_element.itertext())
+        texts.append(target_element.tail or "")
+        for sibling in target_element.itersiblings():
+            # 注释、处理指令的tag不是字符串，只取它们后面的文本
+            if isinstance(sibling.tag, str):
+                # 如果遇到同级别的标题且是另一个API section，停止
+                if sibling.tag in HEADING_TAGS and sibling.get("id") != target_api:
+                    if any(keyword in sibling.text_content().lower() for keyword in SECTION_KEYWORDS):
+                        break
+                texts.extend(sibling.itertext())
+            texts.append(sibling.tail or "")
+
+        text = f"TARGET API: {target_api}\n"
+        text += "TARGET API SECTION:\n"
+        text += "\n".join(part.strip() for part in texts if part.strip())
+        return text
+
+    def extract_content(self, html, url, encoding=None):
+        """解析HTML，并定位到目标API部分（html为bytes时由解析器解码，encoding为响应头声明的编码）"""
+        # 提取目标API名称（从URL的hash部分）
+        target_api = ""
+        if "#" in url:
+            target_api = url.split("#")[-1]
+
+        # 安装了lxml时直接在lxml树上提取；未安装或lxml无法解析时使用BeautifulSoup
+        if etree is not None:
+            text = self.extract_content_lxml(html, target_api, encoding)
+            if text is not None:
+                return text
+
+        if isinstance(html, bytes):
+            soup = BeautifulSoup(html, BS_PARSER, from_encoding=encoding)
+        else:
+            soup = BeautifulSoup(html, BS_PARSER)
+
+        # 移除脚本和样式标签（在原始文档树上一次完成，定位目标API部分和整页提取都直接使用这棵树）
+        for script in soup(["script", "style"]):
+            script.decompose()
+
+        # 尝试定位到目标API部分
+        if target_api:
+            # 方法1: 通过id属性查找对应的元素
+            target_element = soup.find(id=target_api)
+            if target_element:
+                # 找到该元素及其后续兄弟元素，直到下一个主要API部分，直接在原树上提取文本
+                texts = [target_element.get_text(separator='\n', strip=True)]
+
+                # 添加后续兄弟元素，直到遇到下一个API section
+                next_sibling = target_element.next_sibling
+                while next_sibling:
+                    if isinstance(next_sibling, Tag):
+                        # 如果遇到同级别的标题，停止
+                        if next_sibling.name in HEADING_TAGS and next_sibling.get('id') != target_api:
+                            # 检查这个标题是否是另一个API section
+                            sibling_text = next_sibling.get_text().strip()
+                            if any(keyword in sibling_text.lower() for keyword in SECTION_KEYWORDS):
+                                break
+                        texts.append(next_sibling.get_text(separator='\n', strip=True))
+                    elif type(next_sibling) in (NavigableString, CData):
+                        # 与get_text()一致：只取文本，跳过注释、doctype等
+                        texts.append(next_sibling.strip())
+                    next_sibling = next_sibling.next_sibling
+
+                # 添加一些上下文信息
+                text = f"TARGET API: {target_api}\n"
+                text += "TARGET API SECTION:\n"
+                text += '\n'.join(part for part in texts if part)
+                return text
+
+        # 如果无法精确定位，则返回整个页面的内容
+        # 获取纯文本内容
+        text = soup.get_text(separator='\n', strip=True)
+
+        # 如果有目标API名称，在内容前添加提示
+        if target_api:
+            text = f"TARGET API: {target_api}\nFULL PAGE CONTENT:\n{text}"
+
+        return text
+
+    def conditional_headers(self, entry):
+        """之前访问过且服务器给出ETag/Last-Modified时（entry为缓存条目），返回条件请求头"""
+        if entry is None:
+            return {}
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
 
+    def read_webpage(self, url):
+        """使用requests读取网页内容，并定位到目标API部分"""
+        try:
+            # 连接5秒，读取15秒；流式读取，超过MAX_RESPONSE_BYTES的部分不下载
+            cached = _PAGE_CACHE.get(url)
+            with self._session.get(url, headers=self.conditional_headers(cached), timeout=(5, 15), stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    print(f"网页未修改，使用缓存内容: {url}")
+                    return cached["text"]
+                response.raise_for_status()  # 抛出HTTP错误
+                # requests对没有charset的text/*默认ISO-8859-1，此时不指定编码，交给解析器按<meta>探测
+                encoding = response.encoding if "charset" in response.headers.get("Content-Type", "").lower() else None
+                parts = []
+                received = 0
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    # 超大页面只保留前MAX_RESPONSE_BYTES字节（提示词本身也只用得到开头部分）
+                    oversized = received + len(chunk) > MAX_RESPONSE_BYTES
+                    if oversized:
+                        chunk = chunk[:MAX_RESPONSE_BYTES - received]
+                    received += len(chunk)
+                    parts.append(chunk)
+                    if oversized:
+                        print(f"⚠️ 网页超过{MAX_RESPONSE_BYTES // (1024 * 1024)}MB，只使用前面部分: {url}")
+                        break
+            body = b"".join(parts)
+            # 直接把原始字节交给解析器，省去requests对整个页面的解码（和无charset时的编码探测）
+            print(f"成功获取网页内容: {url} (长度: {len(body)})")
+            text = self.extract_content(body, url, encoding)
+            _PAGE_CACHE.set(url, response.headers, text)
             return text
 
         except requests.exceptions.Timeout:
@@ -189,9 +754,75 @@ class VisitGPT4o:
             print(f"网页读取错误: {url} - {str(e)}")
             return ""
 
+    async def read_webpage_async(self, client, url):
+        """read_webpage()的异步版本：用共享的httpx.AsyncClient下载，解析放到线程中避免阻塞事件循环"""
+        try:
+            # shelve读写是阻塞的磁盘I/O，放到线程中
+            cached = await asyncio.to_thread(_PAGE_CACHE.get, url)
+            async with client.stream("GET", url, headers=self.conditional_headers(cached)) as response:
+                if response.status_code == 304 and cached is not None:
+                    print(f"网页未修改，使用缓存内容: {url}")
+                    return cached["text"]
+                response.raise_for_status()
+                parts = []
+                received = 0
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    # 超大页面只保留前MAX_RESPONSE_BYTES字节（提示词本身也只用得到开头部分）
+                    oversized = received + len(chunk) > MAX_RESPONSE_BYTES
+                    if oversized:
+                        chunk = chunk[:MAX_RESPONSE_BYTES - received]
+                    received += len(chunk)
+                    parts.append(chunk)
+                    if oversized:
+                        print(f"⚠️ 网页超过{MAX_RESPONSE_BYTES // (1024 * 1024)}MB，只使用前面部分: {url}")
+                        break
+            body = b"".join(parts)
+            print(f"成功获取网页内容: {url} (长度: {len(body)})")
+            # lxml解析是阻塞的CPU操作，放到线程中，不占用事件循环
+            text = await asyncio.to_thread(self.extract_content, body, url, response.charset_encoding)
+            await asyncio.to_thread(_PAGE_CACHE.set, url, response.headers, text)
+            return text
+
+        except httpx.TimeoutException:
+            print(f"网页读取超时: {url}")
+            return ""
+        except httpx.HTTPError as e:
+            print(f"网页请求错误: {url} - {str(e)}")
+            return ""
+        except Exception as e:
+            print(f"网页读取错误: {url} - {str(e)}")
+            return ""
+
+    def truncate_content(self, url, webpage_content):
+        """内容过长时按token截断，使单个网页的提示词不超过INPUT_TOKEN_BUDGET"""
+        print(f"网页内容长度: {len(webpage_content)} 字符")
+        content_budget = max(0, INPUT_TOKEN_BUDGET - PROMPT_OVERHEAD_TOKENS - count_tokens(url))
+        truncated = truncate_to_tokens(webpage_content, content_budget)
+        if truncated is not None:
+            webpage_content = truncated + "...\n[内容已截断]"
+            print(f"网页内容已截断至{content_budget} token")
+        return webpage_content
+
+    def build_messages(self, url, webpage_content):
+        """截断过长内容并构建提示词消息"""
+        webpage_content = self.truncate_content(url, webpage_content)
+
+        # 构建提示词：固定的system消息 + URL和网页内容
+        prompt = _USER_PROMPT_PRE + url + _USER_PROMPT_MID + webpage_content + _USER_PROMPT_POST
+        return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+    def build_group_messages(self, pages):
+        """构建分组提示词消息：pages为[(url, 网页内容), ...]，每个网页按单个网页的额度截断"""
+        sections = "".join(
+            f"## URL {number}\n{url}\n\n### Webpage Content\n{self.truncate_content(url, webpage_content)}\n\n"
+            for number, (url, webpage_content) in enumerate(pages, 1)
+        )
+        prompt = GROUP_USER_PROMPT_HEAD.format(count=len(pages)) + sections
+        return [{"role": "system", "content": GROUP_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
     def call(self, params):
         """主调用方法：读取网页并提取信息"""
-        params = json.loads(params)
+        params = json_loads(params)
         url = params.get("url")
         goal = params.get("goal")
 
@@ -201,22 +832,157 @@ class VisitGPT4o:
         webpage_content = self.read_webpage(url)
         if not webpage_content:
             print(f"❌ 无法读取网页内容: {url}")
-            return json.dumps({"error": "无法读取网页内容"}, ensure_ascii=False)
-
-        print(f"网页内容长度: {len(webpage_content)} 字符")
+            return json_dumps({"error": "无法读取网页内容"})
 
-        # 如果内容过长，截断前2000个字符
-        if len(webpage_content) > 2000:
-            webpage_content = webpage_content[:2000] + "...\n[内容已截断]"
-            print(f"网页内容已截断至2000字符")
+        if not CHANGE_TRIGGER_RE.search(webpage_content):
+            print(f"✅ 网页不含变更关键词，跳过GPT分析: {url}")
+            return EMPTY_RESULT
 
-        # 构建提示词
-        prompt = extractor_prompt.format(url=url, webpage_content=webpage_content)
+        messages = self.build_messages(url, webpage_content)
 
         # 调用GPT-4o提取信息
         print(f"正在调用GPT-4o分析...")
-        messages = [{"role": "user", "content": prompt}]
         result = self.llm(messages)
 
         print(f"✅ 处理完成: {url}")
-        return result
\ No newline at end of file
+        return result
+
+    def call_batch(self, params_list, max_workers=10):
+        """同步批量处理多个URL（线程池，下载和GPT调用等待I/O时释放GIL），结果与params_list顺序一致"""
+        def call_one(params):
+            try:
+                return self.call(params)
+            except Exception as e:
+                # 单个URL失败不影响其他URL
+                print(f"❌ 处理失败: {str(e)}")
+                return json_dumps({"error": str(e)})
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(call_one, params_list))
+
+    async def call_async(self, client, params):
+        """call()的异步版本：client为共享的httpx.AsyncClient"""
+        params = json_loads(params)
+        url = params.get("url")
+
+        print(f"开始处理: {url}")
+
+        webpage_content = await self.read_webpage_async(client, url)
+        if not webpage_content:
+            print(f"❌ 无法读取网页内容: {url}")
+            return json_dumps({"error": "无法读取网页内容"})
+
+        if not CHANGE_TRIGGER_RE.search(webpage_content):
+            print(f"✅ 网页不含变更关键词，跳过GPT分析: {url}")
+            return EMPTY_RESULT
+
+        messages = self.build_messages(url, webpage_content)
+
+        print(f"正在调用GPT-4o分析...")
+        result = await self.llm_async(messages)
+
+        print(f"✅ 处理完成: {url}")
+        return result
+
+    async def call_stream(self, client, params):
+        """call_async()的流式版本：逐段产出GPT响应，拼接后即为call_async()的结果"""
+        params = json_loads(params)
+        url = params.get("url")
+
+        print(f"开始处理: {url}")
+
+        webpage_content = await self.read_webpage_async(client, url)
+        if not webpage_content:
+            print(f"❌ 无法读取网页内容: {url}")
+            yield json_dumps({"error": "无法读取网页内容"})
+            return
+
+        if not CHANGE_TRIGGER_RE.search(webpage_content):
+            print(f"✅ 网页不含变更关键词，跳过GPT分析: {url}")
+            yield EMPTY_RESULT
+            return
+
+        messages = self.build_messages(url, webpage_content)
+
+        print(f"正在调用GPT-4o分析...")
+        async for part in self.llm_stream(messages):
+            yield part
+
+        print(f"✅ 处理完成: {url}")
+
+    async def call_many(self, params_list, concurrency=10):
+        """批量处理多个URL：共享一个httpx.AsyncClient，用信号量限制同时处理的URL数，结果与params_list顺序一致"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(params):
+            async with semaphore:
+                try:
+                    return await self.call_async(client, params)
+                except Exception as e:
+                    # 单个URL失败不影响其他URL
+                    print(f"❌ 处理失败: {str(e)}")
+                    return json_dumps({"error": str(e)})
+
+        async with build_async_client(concurrency) as client:
+            return await asyncio.gather(*[bounded(params) for params in params_list])
+
+    async def llm_group(self, pages):
+        """一次GPT请求分析一组网页，返回与pages顺序一致的结果；分组响应无效时逐个网页调用"""
+        if len(pages) > 1:
+            try:
+                content = await self.llm_async(self.build_group_messages(pages), max_tokens=LLM_MAX_TOKENS * len(pages))
+                items = {}
+                for item in json_loads(content)["results"]:
+                    if isinstance(item, dict) and isinstance(item.get("index"), int):
+                        items[item.pop("index")] = item
+                if all(number in items for number in range(1, len(pages) + 1)):
+                    return [json_dumps(items[number]) for number in range(1, len(pages) + 1)]
+                print(f"分组响应缺少部分网页的结果，逐个网页重新分析")
+            except Exception as e:
+                print(f"分组GPT分析失败: {str(e)}，逐个网页重新分析")
+
+        async def single(url, webpage_content):
+            try:
+                return await self.llm_async(self.build_messages(url, webpage_content))
+            except Exception as e:
+                print(f"❌ 处理失败: {url} - {str(e)}")
+                return json_dumps({"error": str(e)})
+
+        return await asyncio.gather(*[single(url, webpage_content) for url, webpage_content in pages])
+
+    async def call_grouped(self, params_list, group_size=5, concurrency=10):
+        """
+        批量处理多个URL，每group_size个网页合并为一次GPT请求（请求数减少为1/group_size，缓解RPM限制）：
+        先并发读取所有网页，再按组调用GPT；结果与params_list顺序一致
+        """
+        urls = [json_loads(params).get("url") for params in params_list]
+        results = [None] * len(urls)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                return await self.read_webpage_async(client, url)
+
+        async with build_async_client(concurrency) as client:
+            contents = await asyncio.gather(*[fetch(url) for url in urls])
+
+        pages = []
+        for i, (url, webpage_content) in enumerate(zip(urls, contents)):
+            if not webpage_content:
+                print(f"❌ 无法读取网页内容: {url}")
+                results[i] = json_dumps({"error": "无法读取网页内容"})
+            elif not CHANGE_TRIGGER_RE.search(webpage_content):
+                print(f"✅ 网页不含变更关键词，跳过GPT分析: {url}")
+                results[i] = EMPTY_RESULT
+            else:
+                pages.append((i, url, webpage_content))
+
+        async def run_group(group):
+            async with semaphore:
+                group_results = await self.llm_group([(url, webpage_content) for _, url, webpage_content in group])
+            for (i, url, _), result in zip(group, group_results):
+                results[i] = result
+                print(f"✅ 处理完成: {url}")
+
+        await asyncio.gather(*[run_group(pages[start:start + group_size]) for start in range(0, len(pages), group_size)])
+        return results